@@ -0,0 +1,81 @@
+# analysis_worker.py
+import queue
+import threading
+import time
+
+import pygame
+
+from engine import Engine
+from tt import TranspositionTable
+
+# Posted to the pygame event queue with kind, generation, result and elapsed (seconds) attributes
+ANALYSIS_DONE = pygame.USEREVENT + 1
+
+# Job kinds
+STATUS = "status"  # result is a game.GameStatus
+HINT = "hint"  # result is an engine.SearchResult
+
+class AnalysisWorker:
+    """Runs game-status checks and engine searches off the pygame thread.
+    
+    Each request works on a snapshot of the game, so the UI can keep playing
+    while it runs. Results come back as ANALYSIS_DONE events; cancel() stops
+    the running search and makes every pending or in-flight result stale.
+    Hints share one transposition table, so later ones start from what
+    earlier ones found.
+    """
+    
+    def __init__(self, post_event=None):
+        self._post_event = post_event or pygame.event.post
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self._stop_event = threading.Event()
+        self._table = TranspositionTable()
+        self._thread = threading.Thread(target=self._run, name="analysis-worker", daemon=True)
+        self._thread.start()
+    
+    def request_status(self, game):
+        """Evaluate checkmate/stalemate/check and the legal moves of the side to move"""
+        self._submit(STATUS, game, None)
+    
+    def request_hint(self, game, time_ms):
+        """Search for the best move for the side to move within time_ms"""
+        self._submit(HINT, game, time_ms)
+    
+    def cancel(self):
+        """Abandon all outstanding work, e.g. when the game restarts or moves on"""
+        with self._lock:
+            self.generation += 1
+            self._stop_event.set()
+            self._stop_event = threading.Event()
+    
+    def shutdown(self):
+        self.cancel()
+        self._jobs.put(None)
+    
+    def _submit(self, kind, game, time_ms):
+        with self._lock:
+            job = (self.generation, kind, game.clone(), time_ms, self._stop_event)
+        self._jobs.put(job)
+    
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            generation, kind, game, time_ms, stop_event = job
+            if stop_event.is_set():
+                continue
+            
+            start = time.perf_counter()
+            if kind == STATUS:
+                result = game.status()
+            else:
+                self._table.new_search()
+                result = Engine(stop_event=stop_event, tt=self._table).search(game, time_ms)
+            
+            # Results of cancelled work are dropped rather than posted
+            if not stop_event.is_set():
+                self._post_event(pygame.event.Event(ANALYSIS_DONE, kind=kind, generation=generation,
+                                                    result=result, elapsed=time.perf_counter() - start))
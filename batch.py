@@ -0,0 +1,198 @@
+# batch.py
+"""Vectorized attack maps, move masks and evaluation for many positions at once.
+
+Positions are (N, 8, 8) int8 arrays laid out like Board.board (row 0 is rank 8),
+with white pieces positive, black pieces negative and 0 for an empty square
+(see the piece codes below). Each position also needs:
+
+    side        (N,) int8: 1 when white is to move, -1 for black
+    castling    (N,) uint8: castling rights mask (zobrist.WHITE_KINGSIDE etc.)
+    en_passant  (N,) int8: file of a pawn that just advanced two squares, or -1
+
+Moves are (N, 64, 64) bool masks indexed [n, from_square, to_square] with
+square = row * 8 + col. They are pseudo-legal: moves that would leave the
+mover's own king in check are included, but otherwise they follow Game's rules,
+down to castling never starting in, passing through or ending in check.
+Promotions appear as a single move, as in Game.
+
+Requires NumPy, which the rest of the game does not need.
+"""
+import numpy as np
+
+from board import KNIGHT_OFFSETS, KING_OFFSETS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS, CASTLING_RIGHTS
+from engine import PIECE_VALUES, PIECE_SQUARE_TABLES, KING_ENDGAME_TABLE, ENDGAME_MATERIAL
+from pieces.pawn import Pawn
+from pieces.rook import Rook
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.queen import Queen
+from pieces.king import King
+
+# Piece codes; black pieces are the negatives
+EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(7)
+PIECE_CODES = {Pawn: PAWN, Knight: KNIGHT, Bishop: BISHOP, Rook: ROOK, Queen: QUEEN, King: KING}
+
+def _pairs(dr, dc):
+    """(from_squares, to_squares) arrays for every on-board step of (dr, dc)"""
+    pairs = [(row * 8 + col, (row + dr) * 8 + col + dc)
+             for row in range(8) for col in range(8)
+             if 0 <= row + dr < 8 and 0 <= col + dc < 8]
+    from_squares, to_squares = zip(*pairs)
+    return np.array(from_squares), np.array(to_squares)
+
+_KNIGHT_PAIRS = [_pairs(dr, dc) for dr, dc in KNIGHT_OFFSETS]
+_KING_PAIRS = [_pairs(dr, dc) for dr, dc in KING_OFFSETS]
+# Per direction, the step pairs for each distance 1 to 7
+_RAY_PAIRS = {(dr, dc): [_pairs(dr * distance, dc * distance) for distance in range(1, 8)]
+              for dr, dc in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+
+# Material plus piece-square value by [piece code, square] from white's side
+# (black looks up the mirrored row), with the king's endgame table separate
+_PIECE_VALUES = np.array([0] + [PIECE_VALUES[cls] for cls in PIECE_CODES], dtype=np.int32)
+_MIDDLEGAME_TABLE = np.zeros((7, 64), dtype=np.int32)
+for _cls, _code in PIECE_CODES.items():
+    _MIDDLEGAME_TABLE[_code] = np.array(PIECE_SQUARE_TABLES[_cls]) + PIECE_VALUES[_cls]
+_ENDGAME_TABLE = _MIDDLEGAME_TABLE.copy()
+_ENDGAME_TABLE[KING] = KING_ENDGAME_TABLE
+_MIRRORED = np.array([(7 - sq // 8) * 8 + sq % 8 for sq in range(64)])
+
+def encode_games(games):
+    """Encode Game objects as (boards, side, castling, en_passant) arrays"""
+    count = len(games)
+    boards = np.zeros((count, 8, 8), dtype=np.int8)
+    side = np.empty(count, dtype=np.int8)
+    castling = np.empty(count, dtype=np.uint8)
+    en_passant = np.full(count, -1, dtype=np.int8)
+    for n, game in enumerate(games):
+        for color, sign in (("white", 1), ("black", -1)):
+            for (row, col), piece in game.board.pieces[color].items():
+                boards[n, row, col] = sign * PIECE_CODES[piece.__class__]
+        side[n] = 1 if game.current_turn == "white" else -1
+        castling[n] = game.board.castling_rights()
+        if game.last_move:
+            last_from, last_to, last_piece = game.last_move
+            if isinstance(last_piece, Pawn) and abs(last_to[0] - last_from[0]) == 2:
+                en_passant[n] = last_to[1]
+    return boards, side, castling, en_passant
+
+def _shift(masks, dr, dc):
+    """Move every set square of (N, 8, 8) masks by (dr, dc), dropping those that fall off"""
+    shifted = np.zeros_like(masks)
+    shifted[:, max(dr, 0):8 + min(dr, 0), max(dc, 0):8 + min(dc, 0)] = \
+        masks[:, max(-dr, 0):8 + min(-dr, 0), max(-dc, 0):8 + min(-dc, 0)]
+    return shifted
+
+def attack_maps(boards):
+    """(N, 2, 8, 8) bool: squares attacked by white ([:, 0]) and by black ([:, 1])"""
+    empty = boards == EMPTY
+    maps = np.zeros((len(boards), 2, 8, 8), dtype=bool)
+    for index, sign in enumerate((1, -1)):
+        attacks = maps[:, index]
+        # White pawns move towards row 0
+        pawns = boards == sign * PAWN
+        attacks |= _shift(pawns, -sign, -1) | _shift(pawns, -sign, 1)
+        for code, offsets in ((KNIGHT, KNIGHT_OFFSETS), (KING, KING_OFFSETS)):
+            pieces = boards == sign * code
+            for dr, dc in offsets:
+                attacks |= _shift(pieces, dr, dc)
+        for codes, directions in (((ROOK, QUEEN), ROOK_DIRECTIONS), ((BISHOP, QUEEN), BISHOP_DIRECTIONS)):
+            sliders = (boards == sign * codes[0]) | (boards == sign * codes[1])
+            for dr, dc in directions:
+                # Extend every ray a square at a time, stopping after the first piece hit
+                ray = _shift(sliders, dr, dc)
+                for _ in range(7):
+                    attacks |= ray
+                    ray = _shift(ray & empty, dr, dc)
+    return maps
+
+def _enemy_attacks(boards, side, maps=None):
+    """(N, 8, 8) bool: squares attacked by the side not to move"""
+    if maps is None:
+        maps = attack_maps(boards)
+    return np.where((side == 1)[:, None, None], maps[:, 1], maps[:, 0])
+
+def in_check(boards, side, maps=None):
+    """(N,) bool: whether the side to move is in check"""
+    kings = boards == (side * KING)[:, None, None]
+    return (kings & _enemy_attacks(boards, side, maps)).any(axis=(1, 2))
+
+def pseudo_legal_moves(boards, side, castling, en_passant, maps=None):
+    """(N, 64, 64) bool move masks for the side to move (see the module docstring)"""
+    count = len(boards)
+    # Relative to the side to move: own pieces positive, enemy pieces negative
+    relative = boards.reshape(count, 64) * side[:, None]
+    own = relative > 0
+    enemy = relative < 0
+    empty = relative == 0
+    not_own = ~own
+    moves = np.zeros((count, 64, 64), dtype=bool)
+    
+    for code, pairs in ((KNIGHT, _KNIGHT_PAIRS), (KING, _KING_PAIRS)):
+        pieces = relative == code
+        for from_squares, to_squares in pairs:
+            moves[:, from_squares, to_squares] |= pieces[:, from_squares] & not_own[:, to_squares]
+    
+    for codes, directions in (((ROOK, QUEEN), ROOK_DIRECTIONS), ((BISHOP, QUEEN), BISHOP_DIRECTIONS)):
+        sliders = (relative == codes[0]) | (relative == codes[1])
+        for direction in directions:
+            # reach[:, sq]: the slider on sq has a clear path so far along this ray
+            reach = sliders.copy()
+            step = direction[0] * 8 + direction[1]
+            for distance, (from_squares, to_squares) in enumerate(_RAY_PAIRS[direction], 1):
+                if distance > 1:
+                    reach[:, from_squares] &= empty[:, to_squares - step]
+                moves[:, from_squares, to_squares] |= reach[:, from_squares] & not_own[:, to_squares]
+    
+    for sign, start_row in ((1, 6), (-1, 1)):
+        pawns = (relative == PAWN) & (side == sign)[:, None]
+        from_squares, to_squares = _pairs(-sign, 0)
+        moves[:, from_squares, to_squares] |= pawns[:, from_squares] & empty[:, to_squares]
+        from_squares = np.arange(start_row * 8, start_row * 8 + 8)
+        middle, to_squares = from_squares - 8 * sign, from_squares - 16 * sign
+        moves[:, from_squares, to_squares] |= (pawns[:, from_squares] & empty[:, middle]
+                                               & empty[:, to_squares])
+        for dc in (-1, 1):
+            from_squares, to_squares = _pairs(-sign, dc)
+            moves[:, from_squares, to_squares] |= pawns[:, from_squares] & enemy[:, to_squares]
+        
+        # En passant onto the square the enemy pawn skipped
+        positions = np.nonzero((side == sign) & (en_passant >= 0))[0]
+        files = en_passant[positions].astype(np.intp)
+        target_row = 2 if sign == 1 else 5
+        victims = (target_row + sign) * 8 + files
+        to_squares = target_row * 8 + files
+        for dc in (-1, 1):
+            valid = (files + dc >= 0) & (files + dc < 8)
+            n, victim, to_square = positions[valid], victims[valid], to_squares[valid]
+            from_squares = victim + dc
+            moves[n, from_squares, to_square] |= (pawns[n, from_squares] & (relative[n, victim] == -PAWN)
+                                                  & empty[n, to_square])
+    
+    # Castling: rights intact, path empty, and the king never passes an attacked square
+    attacked = _enemy_attacks(boards, side, maps).reshape(count, 64)
+    for right, (king_row, king_col), (rook_row, rook_col) in CASTLING_RIGHTS:
+        sign = 1 if king_row == 7 else -1
+        king_square, rook_square = king_row * 8 + king_col, rook_row * 8 + rook_col
+        direction = 1 if rook_col > king_col else -1
+        allowed = ((castling & right) != 0) & (side == sign)
+        allowed &= (relative[:, king_square] == KING) & (relative[:, rook_square] == ROOK)
+        for square in range(min(king_square, rook_square) + 1, max(king_square, rook_square)):
+            allowed &= empty[:, square]
+        for square in (king_square, king_square + direction, king_square + 2 * direction):
+            allowed &= ~attacked[:, square]
+        moves[:, king_square, king_square + 2 * direction] |= allowed
+    return moves
+
+def evaluate(boards, side):
+    """(N,) int32 engine.evaluate scores, from the side to move's point of view"""
+    count = len(boards)
+    flat = boards.reshape(count, 64).astype(np.int32)
+    codes = np.abs(flat)
+    white = flat > 0
+    squares = np.where(white, np.arange(64), _MIRRORED)
+    
+    non_pawn = _PIECE_VALUES[codes] * ((codes > PAWN) & (codes < KING))
+    endgame = non_pawn.sum(axis=1) <= ENDGAME_MATERIAL
+    values = np.where(endgame[:, None], _ENDGAME_TABLE[codes, squares], _MIDDLEGAME_TABLE[codes, squares])
+    score = np.where(white, values, -values).sum(axis=1)
+    return (score * side).astype(np.int32)
@@ -0,0 +1,152 @@
+# bitboard.py
+from board import Board, KNIGHT_OFFSETS, KING_OFFSETS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS
+from pieces.pawn import Pawn
+from pieces.rook import Rook
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.queen import Queen
+from pieces.king import King
+
+# Squares are numbered row * 8 + col, so bit 0 is a8 and bit 63 is h1
+SQUARES = [(sq // 8, sq % 8) for sq in range(64)]
+
+PIECE_TYPES = (Pawn, Knight, Bishop, Rook, Queen, King)
+
+def _step_mask(sq, offsets):
+    """Mask of the on-board squares one step away from sq for each offset"""
+    row, col = SQUARES[sq]
+    mask = 0
+    for dr, dc in offsets:
+        r, c = row + dr, col + dc
+        if 0 <= r < 8 and 0 <= c < 8:
+            mask |= 1 << (r * 8 + c)
+    return mask
+
+def _ray_mask(sq, direction):
+    """Mask of every square from sq (exclusive) to the edge in one direction"""
+    row, col = SQUARES[sq]
+    dr, dc = direction
+    mask = 0
+    r, c = row + dr, col + dc
+    while 0 <= r < 8 and 0 <= c < 8:
+        mask |= 1 << (r * 8 + c)
+        r += dr
+        c += dc
+    return mask
+
+# Precomputed attack tables
+KNIGHT_ATTACKS = [_step_mask(sq, KNIGHT_OFFSETS) for sq in range(64)]
+KING_ATTACKS = [_step_mask(sq, KING_OFFSETS) for sq in range(64)]
+PAWN_ATTACKS = {
+    "white": [_step_mask(sq, [(-1, -1), (-1, 1)]) for sq in range(64)],
+    "black": [_step_mask(sq, [(1, -1), (1, 1)]) for sq in range(64)],
+}
+RAYS = {d: [_ray_mask(sq, d) for sq in range(64)] for d in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+
+# Rays pointing towards higher square numbers find their nearest blocker in the lowest bit
+_INCREASING = {d: d[0] > 0 or (d[0] == 0 and d[1] > 0) for d in RAYS}
+
+def sliding_attacks(sq, occupied, directions):
+    """Squares attacked along the given rays, stopping at (and including) blockers"""
+    attacks = 0
+    for direction in directions:
+        ray = RAYS[direction][sq]
+        blockers = ray & occupied
+        if blockers:
+            if _INCREASING[direction]:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= RAYS[direction][blocker]
+        attacks |= ray
+    return attacks
+
+def mask_to_squares(mask):
+    """List the (row, col) squares set in a mask"""
+    squares = []
+    while mask:
+        low = mask & -mask
+        squares.append(SQUARES[low.bit_length() - 1])
+        mask ^= low
+    return squares
+
+class BitBoard(Board):
+    """Board backed by one 64-bit mask per piece type and color plus occupancy.
+    
+    The 8x8 grid of piece objects is still kept so get_piece and the rest of
+    the Board interface behave identically; the masks drive move generation.
+    """
+    
+    def __init__(self, setup=True):
+        self.bitboards = {color: {piece_type: 0 for piece_type in PIECE_TYPES}
+                          for color in ("white", "black")}
+        self.occupied = {"white": 0, "black": 0}
+        super().__init__(setup)
+    
+    def set_piece(self, position, piece):
+        row, col = position
+        if 0 <= row < 8 and 0 <= col < 8:
+            bit = 1 << (row * 8 + col)
+            old_piece = self.board[row][col]
+            if old_piece:
+                self.bitboards[old_piece.color][old_piece.__class__] &= ~bit
+                self.occupied[old_piece.color] &= ~bit
+            if piece:
+                self.bitboards[piece.color][piece.__class__] |= bit
+                self.occupied[piece.color] |= bit
+        super().set_piece(position, piece)
+    
+    def attacks(self, piece):
+        """Mask of the squares a piece attacks (for pawns, its diagonal captures)"""
+        row, col = piece.position
+        sq = row * 8 + col
+        occupied = self.occupied["white"] | self.occupied["black"]
+        
+        if isinstance(piece, Pawn):
+            return PAWN_ATTACKS[piece.color][sq]
+        if isinstance(piece, Knight):
+            return KNIGHT_ATTACKS[sq]
+        if isinstance(piece, King):
+            return KING_ATTACKS[sq]
+        if isinstance(piece, Rook):
+            return sliding_attacks(sq, occupied, ROOK_DIRECTIONS)
+        if isinstance(piece, Bishop):
+            return sliding_attacks(sq, occupied, BISHOP_DIRECTIONS)
+        return sliding_attacks(sq, occupied, ROOK_DIRECTIONS + BISHOP_DIRECTIONS)
+    
+    def piece_moves(self, piece):
+        enemy_color = "black" if piece.color == "white" else "white"
+        
+        if not isinstance(piece, Pawn):
+            return mask_to_squares(self.attacks(piece) & ~self.occupied[piece.color])
+        
+        # Pawns capture diagonally and push straight ahead onto empty squares
+        row, col = piece.position
+        empty = ~(self.occupied["white"] | self.occupied["black"])
+        moves = self.attacks(piece) & self.occupied[enemy_color]
+        direction = -1 if piece.color == "white" else 1
+        push = 1 << ((row + direction) * 8 + col) if 0 <= row + direction < 8 else 0
+        if push & empty:
+            moves |= push
+            start_row = 6 if piece.color == "white" else 1
+            if row == start_row:
+                double_push = 1 << ((row + 2 * direction) * 8 + col)
+                moves |= double_push & empty
+        return mask_to_squares(moves)
+    
+    def is_square_attacked(self, position, by_color):
+        row, col = position
+        sq = row * 8 + col
+        pieces = self.bitboards[by_color]
+        if KNIGHT_ATTACKS[sq] & pieces[Knight] or KING_ATTACKS[sq] & pieces[King]:
+            return True
+        
+        # A pawn attacks sq exactly when an opposing pawn on sq would attack it
+        defender = "black" if by_color == "white" else "white"
+        if PAWN_ATTACKS[defender][sq] & pieces[Pawn]:
+            return True
+        
+        occupied = self.occupied["white"] | self.occupied["black"]
+        if sliding_attacks(sq, occupied, ROOK_DIRECTIONS) & (pieces[Rook] | pieces[Queen]):
+            return True
+        return bool(sliding_attacks(sq, occupied, BISHOP_DIRECTIONS) & (pieces[Bishop] | pieces[Queen]))
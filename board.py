@@ -1,49 +1,74 @@
-import pygame
 from pieces.pawn import Pawn
 from pieces.rook import Rook
 from pieces.knight import Knight
 from pieces.bishop import Bishop
 from pieces.queen import Queen
 from pieces.king import King
-from utils import load_image
+from zobrist import PIECE_KEYS, CASTLING_KEYS, WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+
+KNIGHT_OFFSETS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+KING_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+ROOK_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+BISHOP_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+# Castling right -> (king square, rook square) that must both be unmoved
+CASTLING_RIGHTS = [
+    (WHITE_KINGSIDE, (7, 4), (7, 7)),
+    (WHITE_QUEENSIDE, (7, 4), (7, 0)),
+    (BLACK_KINGSIDE, (0, 4), (0, 7)),
+    (BLACK_QUEENSIDE, (0, 4), (0, 0)),
+]
+
+class MoveUndo:
+    """Everything Board.unmake_move needs to take back a move"""
+    __slots__ = ("from_pos", "to_pos", "piece", "had_moved", "captured", "captured_pos",
+                 "promoted", "rook", "rook_from", "rook_to", "rook_had_moved",
+                 "zobrist_key", "castling_rights")
+    
+    def __init__(self, from_pos, to_pos, piece, zobrist_key, castling_rights):
+        self.from_pos = from_pos
+        self.to_pos = to_pos
+        self.piece = piece
+        self.had_moved = piece.has_moved
+        self.captured = None
+        self.captured_pos = to_pos
+        self.promoted = None  # Piece that replaced a promoting pawn
+        self.rook = None  # Rook moved alongside the king when castling
+        self.rook_from = None
+        self.rook_to = None
+        self.rook_had_moved = False
+        self.zobrist_key = zobrist_key
+        self.castling_rights = castling_rights
 
 class Board:
-    def __init__(self):
+    def __init__(self, setup=True):
         # Initialize an 8x8 board with None values
         self.board = [[None for _ in range(8)] for _ in range(8)]
-        self.setup_pieces()
+        
+        # Per-color {position: piece} and king squares, kept in sync by set_piece
+        self.pieces = {"white": {}, "black": {}}
+        self.king_squares = {"white": None, "black": None}
+        
+        # Zobrist key of the pieces and castling rights; set_piece and
+        # make_move keep it up to date, and Game adds side to move and en passant
+        self.zobrist_key = 0
+        self._castling_rights = 0
+        if setup:
+            self.setup_pieces()
+            self.reset_zobrist_key()
         
     def setup_pieces(self):
-        # Place pawns
+        # Back rank order from the a-file to the h-file
+        back_rank = [Rook, Knight, Bishop, Queen, King, Bishop, Knight, Rook]
+        
         for col in range(8):
-            self.board[1][col] = Pawn("black", (1, col))
-            self.board[6][col] = Pawn("white", (6, col))
-        
-        # Place rooks
-        self.board[0][0] = Rook("black", (0, 0))
-        self.board[0][7] = Rook("black", (0, 7))
-        self.board[7][0] = Rook("white", (7, 0))
-        self.board[7][7] = Rook("white", (7, 7))
-        
-        # Place knights
-        self.board[0][1] = Knight("black", (0, 1))
-        self.board[0][6] = Knight("black", (0, 6))
-        self.board[7][1] = Knight("white", (7, 1))
-        self.board[7][6] = Knight("white", (7, 6))
-        
-        # Place bishops
-        self.board[0][2] = Bishop("black", (0, 2))
-        self.board[0][5] = Bishop("black", (0, 5))
-        self.board[7][2] = Bishop("white", (7, 2))
-        self.board[7][5] = Bishop("white", (7, 5))
-        
-        # Place queens
-        self.board[0][3] = Queen("black", (0, 3))
-        self.board[7][3] = Queen("white", (7, 3))
-        
-        # Place kings
-        self.board[0][4] = King("black", (0, 4))
-        self.board[7][4] = King("white", (7, 4))
+            # Place pawns
+            self.set_piece((1, col), Pawn("black", (1, col)))
+            self.set_piece((6, col), Pawn("white", (6, col)))
+            
+            # Place rooks, knights, bishops, queens and kings
+            self.set_piece((0, col), back_rank[col]("black", (0, col)))
+            self.set_piece((7, col), back_rank[col]("white", (7, col)))
     
     def get_piece(self, position):
         row, col = position
@@ -54,9 +79,45 @@ class Board:
     def set_piece(self, position, piece):
         row, col = position
         if 0 <= row < 8 and 0 <= col < 8:
+            old_piece = self.board[row][col]
+            if old_piece:
+                del self.pieces[old_piece.color][position]
+                self.zobrist_key ^= PIECE_KEYS[old_piece.color][old_piece.__class__][row * 8 + col]
+                if self.king_squares[old_piece.color] == position:
+                    self.king_squares[old_piece.color] = None
+            
             self.board[row][col] = piece
             if piece:
                 piece.position = position
+                self.pieces[piece.color][position] = piece
+                self.zobrist_key ^= PIECE_KEYS[piece.color][piece.__class__][row * 8 + col]
+                if isinstance(piece, King):
+                    self.king_squares[piece.color] = position
+    
+    def castling_rights(self):
+        """Bit mask of the castling rights still available (see zobrist.py)"""
+        rights = 0
+        for right, king_pos, rook_pos in CASTLING_RIGHTS:
+            king = self.board[king_pos[0]][king_pos[1]]
+            rook = self.board[rook_pos[0]][rook_pos[1]]
+            if (isinstance(king, King) and isinstance(rook, Rook) and king.color == rook.color
+                    and not king.has_moved and not rook.has_moved):
+                rights |= right
+        return rights
+    
+    def reset_zobrist_key(self):
+        """Recompute the Zobrist key from scratch, e.g. after editing has_moved flags"""
+        key = 0
+        for color in ("white", "black"):
+            for (row, col), piece in self.pieces[color].items():
+                key ^= PIECE_KEYS[color][piece.__class__][row * 8 + col]
+        self._castling_rights = self.castling_rights()
+        self.zobrist_key = key ^ CASTLING_KEYS[self._castling_rights]
+        return self.zobrist_key
+    
+    def get_pieces(self, color):
+        """List the pieces of one color; a copy, so moves can be made while iterating"""
+        return list(self.pieces[color].values())
     
     def move_piece(self, from_pos, to_pos):
         piece = self.get_piece(from_pos)
@@ -79,39 +140,130 @@ class Board:
             return True
         return False
     
+    def make_move(self, from_pos, to_pos, promotion=None):
+        """Make a move in place and return the MoveUndo that takes it back.
+        
+        Castling (king moving two files) and en passant (pawn moving diagonally
+        onto an empty square) are recognised from the move itself. The move is
+        not validated; pass moves from Game.get_valid_moves.
+        """
+        piece = self.get_piece(from_pos)
+        undo = MoveUndo(from_pos, to_pos, piece, self.zobrist_key, self._castling_rights)
+        to_row, to_col = to_pos
+        
+        if isinstance(piece, Pawn) and from_pos[1] != to_col and not self.board[to_row][to_col]:
+            # En passant: the captured pawn sits beside the capturing pawn
+            undo.captured_pos = (from_pos[0], to_col)
+            undo.captured = self.get_piece(undo.captured_pos)
+            self.set_piece(undo.captured_pos, None)
+        else:
+            undo.captured = self.board[to_row][to_col]
+        
+        self.set_piece(to_pos, piece)
+        self.set_piece(from_pos, None)
+        piece.has_moved = True
+        
+        if isinstance(piece, King) and abs(to_col - from_pos[1]) == 2:
+            # Castling: bring the rook to the other side of the king
+            undo.rook_from = (to_row, 7 if to_col > from_pos[1] else 0)
+            undo.rook_to = (to_row, 5 if to_col > from_pos[1] else 3)
+            undo.rook = self.get_piece(undo.rook_from)
+            undo.rook_had_moved = undo.rook.has_moved
+            self.set_piece(undo.rook_to, undo.rook)
+            self.set_piece(undo.rook_from, None)
+            undo.rook.has_moved = True
+        elif isinstance(piece, Pawn) and to_row in (0, 7):
+            # Pawn promotion, to a queen unless told otherwise
+            undo.promoted = (promotion or Queen)(piece.color, to_pos)
+            undo.promoted.has_moved = True
+            self.set_piece(to_pos, undo.promoted)
+        
+        # Moving a king or rook, or capturing a rook, can cost castling rights
+        if isinstance(piece, (King, Rook)) or isinstance(undo.captured, Rook):
+            rights = self.castling_rights()
+            if rights != self._castling_rights:
+                self.zobrist_key ^= CASTLING_KEYS[self._castling_rights] ^ CASTLING_KEYS[rights]
+                self._castling_rights = rights
+        
+        return undo
+    
+    def unmake_move(self, undo):
+        """Take back a move made with make_move, restoring the board exactly"""
+        if undo.rook:
+            self.set_piece(undo.rook_from, undo.rook)
+            self.set_piece(undo.rook_to, None)
+            undo.rook.has_moved = undo.rook_had_moved
+        
+        self.set_piece(undo.from_pos, undo.piece)
+        self.set_piece(undo.to_pos, None)
+        undo.piece.has_moved = undo.had_moved
+        
+        if undo.captured:
+            self.set_piece(undo.captured_pos, undo.captured)
+        
+        self.zobrist_key = undo.zobrist_key
+        self._castling_rights = undo.castling_rights
+    
+    def piece_moves(self, piece):
+        """Pseudo-legal destinations for a piece, without castling or en passant"""
+        return piece.get_valid_moves(self)
+    
+    def is_square_attacked(self, position, by_color):
+        """Check whether any piece of by_color attacks a square.
+        
+        Probes outward from the square like a "super-piece": knight jumps,
+        king steps, pawn diagonals and sliding rays up to the first blocker.
+        """
+        row, col = position
+        
+        # Knights and kings
+        for dr, dc in KNIGHT_OFFSETS:
+            piece = self.get_piece((row + dr, col + dc))
+            if isinstance(piece, Knight) and piece.color == by_color:
+                return True
+        for dr, dc in KING_OFFSETS:
+            piece = self.get_piece((row + dr, col + dc))
+            if isinstance(piece, King) and piece.color == by_color:
+                return True
+        
+        # Pawns attack diagonally forward, so look back towards their side
+        pawn_row = row + 1 if by_color == "white" else row - 1
+        for pawn_col in (col - 1, col + 1):
+            piece = self.get_piece((pawn_row, pawn_col))
+            if isinstance(piece, Pawn) and piece.color == by_color:
+                return True
+        
+        # Sliding pieces: the first piece met along each ray
+        for directions, slider in ((ROOK_DIRECTIONS, Rook), (BISHOP_DIRECTIONS, Bishop)):
+            for dr, dc in directions:
+                r, c = row + dr, col + dc
+                while 0 <= r < 8 and 0 <= c < 8:
+                    piece = self.board[r][c]
+                    if piece:
+                        if piece.color == by_color and isinstance(piece, (slider, Queen)):
+                            return True
+                        break
+                    r += dr
+                    c += dc
+        
+        return False
+    
     def find_king(self, color):
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if isinstance(piece, King) and piece.color == color:
-                    return (row, col)
-        return None
+        return self.king_squares[color]
     
     def clone(self):
-        """Create a deep copy of the board for move validation"""
-        new_board = Board()
-        new_board.board = [[None for _ in range(8)] for _ in range(8)]
+        """Create a deep copy of the board"""
+        new_board = self.__class__(setup=False)
         
         for row in range(8):
             for col in range(8):
-                piece = self.get_piece((row, col))
+                piece = self.board[row][col]
                 if piece:
-                    # Create a new piece of the same type
-                    if isinstance(piece, Pawn):
-                        new_board.board[row][col] = Pawn(piece.color, (row, col))
-                    elif isinstance(piece, Rook):
-                        new_piece = Rook(piece.color, (row, col))
-                        new_piece.has_moved = piece.has_moved
-                        new_board.board[row][col] = new_piece
-                    elif isinstance(piece, Knight):
-                        new_board.board[row][col] = Knight(piece.color, (row, col))
-                    elif isinstance(piece, Bishop):
-                        new_board.board[row][col] = Bishop(piece.color, (row, col))
-                    elif isinstance(piece, Queen):
-                        new_board.board[row][col] = Queen(piece.color, (row, col))
-                    elif isinstance(piece, King):
-                        new_piece = King(piece.color, (row, col))
-                        new_piece.has_moved = piece.has_moved
-                        new_board.board[row][col] = new_piece
+                    # Create a new piece of the same type with the same state
+                    new_piece = piece.__class__(piece.color, (row, col))
+                    new_piece.has_moved = piece.has_moved
+                    new_board.set_piece((row, col), new_piece)
         
+        new_board.zobrist_key = self.zobrist_key
+        new_board._castling_rights = self._castling_rights
         return new_board
\ No newline at end of file
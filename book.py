@@ -0,0 +1,214 @@
+# book.py
+"""Opening books: weighted moves per position, read straight from disk.
+
+A book is a flat file of 16-byte big-endian entries sorted by key, laid out
+like a Polyglot book:
+
+    key     8 bytes  Zobrist key of the position (board.zobrist_key)
+    move    2 bytes  to file, to rank, from file, from rank (3 bits each, low
+                     bits first), then the promotion piece (1 knight .. 4 queen);
+                     castling is written as the king taking its own rook
+    weight  2 bytes  how strongly the move is recommended
+    learn   4 bytes  unused, zero
+
+Keys are this game's own Zobrist keys, not Polyglot's, so books have to be
+built with the builder here. The file is memory-mapped and binary searched,
+so opening even a very large book is instant and only the pages a lookup
+touches are ever read.
+
+    python book.py build book.bin games.pgn more.pgn --plies 16 --min-games 3
+    python book.py probe book.bin --fen "<fen>"
+"""
+import argparse
+import collections
+import mmap
+import os
+import random
+import struct
+import sys
+
+from fen import STARTING_FEN, load_fen
+from perft import move_name
+from pgn import read_games, parse_san
+from pieces.rook import Rook
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.queen import Queen
+from pieces.king import King
+
+ENTRY = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+MAX_WEIGHT = 0xFFFF
+
+PROMOTION_CODES = {Knight: 1, Bishop: 2, Rook: 3, Queen: 4}
+PROMOTION_TYPES = {code: piece_type for piece_type, code in PROMOTION_CODES.items()}
+
+# Points a move earns in the builder, by result from the mover's point of view
+WIN_POINTS = 2
+DRAW_POINTS = 1
+
+class OpeningBook:
+    """Read-only, memory-mapped opening book; use as a context manager or close() it"""
+    
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        length = os.fstat(self._file.fileno()).st_size
+        if length % ENTRY.size:
+            self._file.close()
+            raise ValueError(f"Not an opening book: {path!r}")
+        # mmap cannot map an empty file; an empty book simply has no entries
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if length else b""
+        self.size = length // ENTRY.size
+    
+    def entries(self, key):
+        """(encoded move, weight) for every entry stored under a key"""
+        # Binary search for the first entry with this key
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self._map, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        found = []
+        for index in range(low, self.size):
+            entry_key, move, weight, _ = ENTRY.unpack_from(self._map, index * ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((move, weight))
+        return found
+    
+    def moves(self, game):
+        """Weighted ((from_pos, to_pos, promotion), weight) book moves for the side to move.
+        
+        Entries that are not legal in the position (a hash collision) are dropped.
+        """
+        legal = set(game.get_all_valid_moves())
+        moves = []
+        for code, weight in self.entries(game.board.zobrist_key):
+            move = decode_move(game, code)
+            if move[:2] in legal:
+                moves.append((move, weight))
+        return moves
+    
+    def choose(self, game, rng=random):
+        """A book move picked at random in proportion to its weight, or None"""
+        moves = [(move, weight) for move, weight in self.moves(game) if weight]
+        if not moves:
+            return None
+        return rng.choices([move for move, _ in moves], [weight for _, weight in moves])[0]
+    
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+def encode_move(game, move):
+    """Book encoding of a legal (from_pos, to_pos, promotion) move"""
+    (from_row, from_col), (to_row, to_col), promotion = move
+    if isinstance(game.board.get_piece((from_row, from_col)), King) and abs(to_col - from_col) == 2:
+        to_col = 7 if to_col > from_col else 0
+    return (to_col | (7 - to_row) << 3 | from_col << 6 | (7 - from_row) << 9
+            | PROMOTION_CODES.get(promotion, 0) << 12)
+
+def decode_move(game, code):
+    """(from_pos, to_pos, promotion) for a book move in the game's current position"""
+    from_pos = (7 - (code >> 9 & 7), code >> 6 & 7)
+    to_pos = (7 - (code >> 3 & 7), code & 7)
+    if isinstance(game.board.get_piece(from_pos), King) and from_pos[0] == to_pos[0] \
+            and abs(to_pos[1] - from_pos[1]) > 1:
+        # The king "takes" its rook: castling
+        to_pos = (to_pos[0], 6 if to_pos[1] > from_pos[1] else 2)
+    return from_pos, to_pos, PROMOTION_TYPES.get(code >> 12 & 7)
+
+def build_book(pgn_paths, out_path, max_plies=16, min_games=1, progress=None):
+    """Compile PGN files into a book of the first max_plies moves of every game.
+    
+    A move earns WIN_POINTS when the side playing it went on to win and
+    DRAW_POINTS for a draw or unknown result. Moves played in fewer than
+    min_games games are left out. Returns (games read, entries written).
+    """
+    # (key, move) -> [games, points]
+    stats = collections.defaultdict(lambda: [0, 0])
+    games = 0
+    for path in pgn_paths:
+        with open(path, errors="replace") as f:
+            for record in read_games(f):
+                games += 1
+                _add_game(stats, record, max_plies)
+                if progress and games % 1000 == 0:
+                    progress(games)
+    
+    # Scale each position's weights down together if any would overflow
+    by_key = collections.defaultdict(list)
+    for (key, move), (count, points) in stats.items():
+        if count >= min_games and points:
+            by_key[key].append((move, points))
+    entries = 0
+    with open(out_path, "wb") as out:
+        for key in sorted(by_key):
+            moves = sorted(by_key[key], key=lambda item: item[1], reverse=True)
+            scale = max(moves[0][1] / MAX_WEIGHT, 1)
+            for move, points in moves:
+                out.write(ENTRY.pack(key, move, max(int(points / scale), 1), 0))
+                entries += 1
+    return games, entries
+
+def _add_game(stats, record, max_plies):
+    """Credit the opening moves of one game; stops at the first unreadable move"""
+    try:
+        game = load_fen(record.headers.get("FEN", STARTING_FEN))
+    except ValueError:
+        return
+    for text in record.moves[:max_plies]:
+        try:
+            move = parse_san(game, text)
+        except ValueError:
+            return
+        if record.result in ("1-0", "0-1"):
+            won = (record.result == "1-0") == (game.current_turn == "white")
+            points = WIN_POINTS if won else 0
+        else:
+            points = DRAW_POINTS
+        entry = stats[(game.board.zobrist_key, encode_move(game, move))]
+        entry[0] += 1
+        entry[1] += points
+        game.apply_move(*move)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or look up opening books")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile PGN files into a book")
+    build.add_argument("book", help="book file to write")
+    build.add_argument("pgn", nargs="+", help="PGN files to read")
+    build.add_argument("--plies", type=int, default=16, help="moves per game to include (default 16)")
+    build.add_argument("--min-games", type=int, default=1, help="drop moves seen in fewer games")
+    probe = commands.add_parser("probe", help="list the book moves for a position")
+    probe.add_argument("book", help="book file to read")
+    probe.add_argument("--fen", default=STARTING_FEN, help="position to look up (default: start)")
+    args = parser.parse_args(argv)
+    
+    if args.command == "build":
+        games, entries = build_book(args.pgn, args.book, args.plies, args.min_games,
+                                    lambda games: print(f"{games} games", flush=True))
+        print(f"Read {games} games, wrote {entries} entries to {args.book}")
+        return 0
+    
+    game = load_fen(args.fen)
+    with OpeningBook(args.book) as book:
+        moves = book.moves(game)
+    total = sum(weight for _, weight in moves) or 1
+    for move, weight in sorted(moves, key=lambda item: item[1], reverse=True):
+        print(f"{move_name(move):<6} {weight:6d} {100 * weight / total:6.1f}%")
+    if not moves:
+        print("No book moves")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,464 @@
+# engine.py
+"""Move search for computer opponents and analysis.
+
+Negamax alpha-beta with iterative deepening and a quiescence search over
+captures, ordering moves by the transposition table, MVV-LVA, killer moves and the
+history heuristic.
+Searches stop at a time limit, a node budget or an external stop event.
+
+    python engine.py --time 2000
+    python engine.py --fen "<fen>" --time 5000
+"""
+import argparse
+import random
+import sys
+import time
+
+from board import Board
+from fen import STARTING_FEN, load_fen, square_name
+from game import FIFTY_MOVE_PLIES
+from pieces.pawn import Pawn
+from pieces.rook import Rook
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.queen import Queen
+from pieces.king import King
+from tablebase import WIN, DRAW, MAX_PLIES as TABLEBASE_PLIES, Tablebases
+from tt import DEFAULT_SIZE_MB, EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+MATE_SCORE = 100000
+INFINITY = 1000000
+MAX_PLY = 64
+# Scores beyond this are mates; tablebase mates can end well past the deepest search ply
+MATE_BOUND = MATE_SCORE - MAX_PLY - TABLEBASE_PLIES
+
+# How often (in nodes) the clock, node budget and stop event are checked
+CHECK_INTERVAL = 1024
+
+PIECE_VALUES = {Pawn: 100, Knight: 320, Bishop: 330, Rook: 500, Queen: 900, King: 0}
+
+# Piece-square tables from white's side, indexed row * 8 + col with row 0 = rank 8;
+# black looks them up with the row mirrored
+PIECE_SQUARE_TABLES = {
+    Pawn: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    Knight: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ],
+    Bishop: [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ],
+    Rook: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0,
+    ],
+    Queen: [
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ],
+    King: [
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20,
+    ],
+}
+
+# Once little material is left the king should head for the centre
+KING_ENDGAME_TABLE = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+]
+ENDGAME_MATERIAL = 1300  # Non-pawn material on the board, both sides together
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time, node budget or stop event runs out"""
+
+class SearchResult:
+    """Outcome of a search: the move to play and how it was found"""
+    __slots__ = ("move", "score", "depth", "nodes", "elapsed")
+    
+    def __init__(self, move, score, depth, nodes, elapsed):
+        self.move = move  # (from_pos, to_pos), or None when there is no legal move
+        self.score = score  # Centipawns from the side to move's point of view
+        self.depth = depth  # Last fully completed depth
+        self.nodes = nodes
+        self.elapsed = elapsed  # Seconds
+    
+    @property
+    def nps(self):
+        return int(self.nodes / self.elapsed) if self.elapsed > 0 else 0
+    
+    def __repr__(self):
+        return (f"SearchResult(move={self.move}, score={self.score}, depth={self.depth}, "
+                f"nodes={self.nodes}, nps={self.nps})")
+
+def evaluate(game):
+    """Static evaluation in centipawns from the side to move's point of view"""
+    board = game.board
+    non_pawn_material = 0
+    for color in ("white", "black"):
+        for piece in board.pieces[color].values():
+            if not isinstance(piece, (Pawn, King)):
+                non_pawn_material += PIECE_VALUES[piece.__class__]
+    endgame = non_pawn_material <= ENDGAME_MATERIAL
+    
+    score = 0
+    for color, sign in (("white", 1), ("black", -1)):
+        for (row, col), piece in board.pieces[color].items():
+            index = (row if color == "white" else 7 - row) * 8 + col
+            piece_type = piece.__class__
+            if piece_type is King and endgame:
+                table = KING_ENDGAME_TABLE
+            else:
+                table = PIECE_SQUARE_TABLES[piece_type]
+            score += sign * (PIECE_VALUES[piece_type] + table[index])
+    return score if game.current_turn == "white" else -score
+
+class Engine:
+    """Iterative-deepening alpha-beta searcher working in place on a Game.
+    
+    tt is an optional tt.TranspositionTable, or anything with the same probe
+    and store methods; call its new_search() before each unrelated search.
+    seed shuffles equally ranked moves, so parallel searchers explore differently.
+    tablebases, a tablebase.Tablebases, scores the endings it covers exactly.
+    """
+    
+    def __init__(self, max_nodes=None, stop_event=None, tt=None, seed=None, tablebases=None):
+        self.max_nodes = max_nodes
+        self.stop_event = stop_event  # Anything with is_set(), e.g. threading.Event
+        self.tt = tt
+        self.tablebases = tablebases
+        self._random = random.Random(seed) if seed is not None else None
+        self.nodes = 0
+        self._deadline = None
+        self._game = None
+        self._killers = []
+        self._history = {}
+        self._iteration_best = None
+    
+    def search(self, game, time_ms=1000, max_depth=MAX_PLY, on_iteration=None):
+        """Search the side to move's best move until the time limit or max_depth.
+        
+        on_iteration, if given, is called with a SearchResult after each
+        completed depth. The game is searched in place and left as it was.
+        """
+        start = time.perf_counter()
+        self._start_search(game, time_ms)
+        
+        root_moves = game.get_all_valid_moves()
+        if self._random:
+            self._random.shuffle(root_moves)
+        if not root_moves:
+            score = -MATE_SCORE if game.is_in_check(game.current_turn) else 0
+            return SearchResult(None, score, 0, 0, time.perf_counter() - start)
+        
+        best_move, best_score, completed_depth = root_moves[0], 0, 0
+        for depth in range(1, max_depth + 1):
+            self._iteration_best = None
+            try:
+                best_score, best_move = self._search_root(depth, root_moves, best_move)
+            except SearchTimeout:
+                # Keep a move from the unfinished iteration only if it beat
+                # the previous best, which is always searched first
+                if self._iteration_best:
+                    best_score, best_move = self._iteration_best
+                break
+            completed_depth = depth
+            if on_iteration:
+                on_iteration(SearchResult(best_move, best_score, depth, self.nodes,
+                                          time.perf_counter() - start))
+            if abs(best_score) >= MATE_BOUND:
+                break
+        
+        return SearchResult(best_move, best_score, completed_depth, self.nodes,
+                            time.perf_counter() - start)
+    
+    def score_position(self, game, depth, ply=0, alpha=-INFINITY, beta=INFINITY, time_ms=None):
+        """Negamax score of a position searched to a fixed depth, for the side to move.
+        
+        ply is the distance from the real search root, which keeps mate scores
+        comparable when the caller searched the first plies itself. Scores
+        outside (alpha, beta) are only bounds. Raises SearchTimeout when stopped.
+        """
+        self._start_search(game, time_ms)
+        return self._negamax(depth, alpha, beta, ply)
+    
+    def _start_search(self, game, time_ms):
+        self._deadline = time.perf_counter() + time_ms / 1000.0 if time_ms is not None else None
+        self._game = game
+        self.nodes = 0
+        self._killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self._history = {}
+    
+    def _count_node(self):
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                raise SearchTimeout()
+            if self.max_nodes is not None and self.nodes >= self.max_nodes:
+                raise SearchTimeout()
+            if self.stop_event is not None and self.stop_event.is_set():
+                raise SearchTimeout()
+    
+    def _search_root(self, depth, root_moves, previous_best):
+        game = self._game
+        alpha, beta = -INFINITY, INFINITY
+        best_move, best_score = None, -INFINITY
+        for move in self._order_moves(root_moves, 0, previous_best):
+            game.apply_move(*move)
+            try:
+                score = -self._negamax(depth - 1, -beta, -alpha, 1)
+            finally:
+                game.unmake_move()
+            if score > best_score:
+                best_move, best_score = move, score
+                if score > alpha:
+                    alpha = score
+                    self._iteration_best = (score, move)
+        return best_score, best_move
+    
+    def _negamax(self, depth, alpha, beta, ply):
+        # Counted first, so nodes settled by a draw rule or the tablebases still
+        # count and still check the clock
+        self._count_node()
+        game = self._game
+        moves = game.get_all_valid_moves()
+        in_check = game.is_in_check(game.current_turn)
+        if not moves:
+            return -MATE_SCORE + ply if in_check else 0
+        # Inside the search, a repetition is scored as a draw as soon as it happens once
+        if ply and (game.halfmove_clock >= FIFTY_MOVE_PLIES or game.repetition_count() > 1):
+            return 0
+        
+        # Endings in the tablebases are known: score them as mates at their distance
+        if self.tablebases:
+            found = self.tablebases.probe(game.board, game.current_turn)
+            if found:
+                result, plies = found
+                if result == DRAW:
+                    return 0
+                score = MATE_SCORE - ply - plies
+                return score if result == WIN else -score
+        
+        # Look one ply further when in check so mates are not cut short
+        if in_check:
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(alpha, beta, ply, counted=True)
+        
+        # A deep enough stored result may settle this node outright
+        hash_move = None
+        key = game.board.zobrist_key
+        entry = self.tt.probe(key) if self.tt else None
+        if entry:
+            entry_depth, bound, score, hash_move = entry
+            score = _score_from_tt(score, ply)
+            if entry_depth >= depth and (bound == EXACT
+                                         or (bound == LOWER_BOUND and score >= beta)
+                                         or (bound == UPPER_BOUND and score <= alpha)):
+                return score
+        
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        for move in self._order_moves(moves, ply, hash_move):
+            game.apply_move(*move)
+            try:
+                score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.unmake_move()
+            
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not self._is_capture(move):
+                            self._remember_cutoff(move, depth, ply)
+                        break
+        
+        if self.tt:
+            if best_score <= original_alpha:
+                bound = UPPER_BOUND
+            elif best_score >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            self.tt.store(key, depth, bound, _score_to_tt(best_score, ply), best_move)
+        return best_score
+    
+    def _quiescence(self, alpha, beta, ply, counted=False):
+        """Search captures (all moves when in check) until the position is quiet"""
+        if not counted:
+            self._count_node()
+        game = self._game
+        moves = game.get_all_valid_moves()
+        in_check = game.is_in_check(game.current_turn)
+        if not moves:
+            return -MATE_SCORE + ply if in_check else 0
+        if ply >= MAX_PLY:
+            return evaluate(game)
+        
+        if not in_check:
+            stand_pat = evaluate(game)
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = [move for move in moves if self._is_capture(move) or self._is_promotion(move)]
+        
+        best_score = alpha if not in_check else -INFINITY
+        for move in self._order_moves(moves, ply):
+            game.apply_move(*move)
+            try:
+                score = -self._quiescence(-beta, -alpha, ply + 1)
+            finally:
+                game.unmake_move()
+            
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+    
+    def _is_capture(self, move):
+        from_pos, to_pos = move
+        board = self._game.board
+        if board.board[to_pos[0]][to_pos[1]]:
+            return True
+        # En passant: a pawn moving diagonally onto an empty square
+        return isinstance(board.board[from_pos[0]][from_pos[1]], Pawn) and from_pos[1] != to_pos[1]
+    
+    def _is_promotion(self, move):
+        from_pos, to_pos = move
+        return to_pos[0] in (0, 7) and isinstance(self._game.board.get_piece(from_pos), Pawn)
+    
+    def _order_moves(self, moves, ply, first_move=None):
+        """Best-first: given move, captures by MVV-LVA, promotions, killers, then history"""
+        board = self._game.board
+        killers = self._killers[ply] if ply < len(self._killers) else (None, None)
+        scored = []
+        for move in moves:
+            from_pos, to_pos = move
+            attacker = board.board[from_pos[0]][from_pos[1]]
+            victim = board.board[to_pos[0]][to_pos[1]]
+            if move == first_move:
+                score = 10000000
+            elif victim:
+                # Most valuable victim, least valuable attacker
+                score = 1000000 + 10 * PIECE_VALUES[victim.__class__] - PIECE_VALUES[attacker.__class__]
+            elif isinstance(attacker, Pawn) and (from_pos[1] != to_pos[1] or to_pos[0] in (0, 7)):
+                score = 900000  # En passant or promotion
+            elif move == killers[0]:
+                score = 800000
+            elif move == killers[1]:
+                score = 700000
+            else:
+                score = self._history.get(move, 0)
+            scored.append((score, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+    
+    def _remember_cutoff(self, move, depth, ply):
+        """Update killers and history for a quiet move that caused a beta cutoff"""
+        killers = self._killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self._history[move] = self._history.get(move, 0) + depth * depth
+
+def _score_to_tt(score, ply):
+    """Store mate scores relative to the node rather than the root"""
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+def _score_from_tt(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+def best_move(game, time_ms=1000, max_nodes=None, stop_event=None):
+    """The engine's choice of (from_pos, to_pos) for the side to move, or None"""
+    return Engine(max_nodes, stop_event).search(game, time_ms).move
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search a position and print the best move")
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to search (default: start)")
+    parser.add_argument("--time", type=int, default=2000, help="time limit in milliseconds")
+    parser.add_argument("--nodes", type=int, help="node budget")
+    parser.add_argument("--depth", type=int, default=MAX_PLY, help="maximum depth in plies")
+    parser.add_argument("--hash", type=int, default=DEFAULT_SIZE_MB,
+                        help="transposition table size in MB (0 for none)")
+    parser.add_argument("--tables", help="endgame tablebase directory")
+    args = parser.parse_args(argv)
+    
+    def report(result):
+        print(f"depth {result.depth:2d}  score {result.score:6d}  nodes {result.nodes:8d}  "
+              f"nps {result.nps:7d}  best {_move_name(result.move)}")
+    
+    game = load_fen(args.fen, Board)
+    tt = TranspositionTable(args.hash) if args.hash > 0 else None
+    tablebases = Tablebases(args.tables) if args.tables else None
+    result = Engine(args.nodes, tt=tt, tablebases=tablebases).search(game, args.time, args.depth,
+                                                                     on_iteration=report)
+    print(f"bestmove {_move_name(result.move)}  ({result.nodes} nodes in {result.elapsed:.2f}s, "
+          f"{result.nps} nps)")
+    return 0
+
+def _move_name(move):
+    return square_name(move[0]) + square_name(move[1]) if move else "(none)"
+
+if __name__ == "__main__":
+    sys.exit(main())
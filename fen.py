@@ -0,0 +1,211 @@
+# fen.py
+"""FEN and packed binary positions.
+
+A packed position is POSITION_SIZE bytes:
+
+    bytes 0-7    occupancy, little-endian, bit row * 8 + col set for each piece
+    bytes 8-23   a 4-bit code per piece in square order, low nibble first
+                 (PACKED_PIECES index, plus 8 for black)
+    byte 24      bit 0 set when black is to move, bits 1-4 the castling rights
+    byte 25      en passant file + 1, or 0
+    byte 26      halfmove clock (plies since a capture or pawn move, up to 255)
+    bytes 27-31  reserved, zero
+
+so millions of positions fit in a flat file and cost a bytes object each to
+send to another process.
+"""
+import struct
+
+from board import Board, CASTLING_RIGHTS
+from game import Game
+from pieces.pawn import Pawn
+from pieces.rook import Rook
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.queen import Queen
+from pieces.king import King
+from zobrist import WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+PIECE_TYPES = {"p": Pawn, "n": Knight, "b": Bishop, "r": Rook, "q": Queen, "k": King}
+PIECE_LETTERS = {piece_type: letter for letter, piece_type in PIECE_TYPES.items()}
+
+# FEN castling letter -> castling right, in FEN order
+CASTLING_LETTERS = {"K": WHITE_KINGSIDE, "Q": WHITE_QUEENSIDE, "k": BLACK_KINGSIDE, "q": BLACK_QUEENSIDE}
+
+POSITION = struct.Struct("<Q16sBBB5x")
+POSITION_SIZE = POSITION.size
+PACKED_PIECES = (None, Pawn, Knight, Bishop, Rook, Queen, King)
+BLACK_CODE = 8
+PIECE_CODES = {piece_type: code for code, piece_type in enumerate(PACKED_PIECES) if piece_type}
+
+def square_name(position):
+    """Algebraic name of a (row, col) square, e.g. (6, 4) -> "e2" """
+    row, col = position
+    return "abcdefgh"[col] + str(8 - row)
+
+def parse_square(name):
+    """(row, col) of an algebraic square name, e.g. "e2" -> (6, 4)"""
+    if len(name) != 2 or name[0] not in "abcdefgh" or name[1] not in "12345678":
+        raise ValueError(f"Invalid square: {name!r}")
+    return (8 - int(name[1]), "abcdefgh".index(name[0]))
+
+def load_fen(fen, board_class=Board):
+    """Build a Game, and its board, from a FEN string.
+    
+    Castling rights become has_moved flags on the kings and rooks, and the
+    en passant square becomes the pawn double move stored in last_move.
+    """
+    fields = fen.split()
+    if len(fields) < 4:
+        raise ValueError(f"FEN needs at least 4 fields: {fen!r}")
+    placement, turn, castling, en_passant = fields[:4]
+    
+    rows = placement.split("/")
+    if len(rows) != 8:
+        raise ValueError(f"FEN placement needs 8 ranks: {placement!r}")
+    
+    board = board_class(setup=False)
+    for row, rank in enumerate(rows):
+        col = 0
+        for char in rank:
+            if char.isdigit():
+                col += int(char)
+                continue
+            piece_type = PIECE_TYPES.get(char.lower())
+            if not piece_type or col > 7:
+                raise ValueError(f"Invalid FEN rank: {rank!r}")
+            _place(board, piece_type, "white" if char.isupper() else "black", (row, col))
+            col += 1
+        if col != 8:
+            raise ValueError(f"Invalid FEN rank: {rank!r}")
+    
+    rights = 0
+    if castling != "-":
+        for char in castling:
+            if char not in CASTLING_LETTERS:
+                raise ValueError(f"Invalid FEN castling field: {castling!r}")
+            rights |= CASTLING_LETTERS[char]
+    
+    if turn not in ("w", "b"):
+        raise ValueError(f"Invalid FEN side to move: {turn!r}")
+    en_passant_file = parse_square(en_passant)[1] if en_passant != "-" else None
+    halfmove_clock = 0
+    if len(fields) > 4:
+        if not fields[4].isdigit():
+            raise ValueError(f"Invalid FEN halfmove clock: {fields[4]!r}")
+        halfmove_clock = int(fields[4])
+    return _make_game(board, "white" if turn == "w" else "black", rights, en_passant_file,
+                      halfmove_clock)
+
+def to_fen(game, fullmove_number=1):
+    """FEN string of the game's current position.
+    
+    The game does not number its moves, so the fullmove number is whatever
+    the caller passes.
+    """
+    ranks = []
+    for row in game.board.board:
+        rank = ""
+        empty = 0
+        for piece in row:
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            letter = PIECE_LETTERS[piece.__class__]
+            rank += letter.upper() if piece.color == "white" else letter
+        ranks.append(rank + (str(empty) if empty else ""))
+    
+    rights = game.board.castling_rights()
+    castling = "".join(letter for letter, right in CASTLING_LETTERS.items() if rights & right) or "-"
+    en_passant_file = _double_push_file(game)
+    if en_passant_file is None:
+        en_passant = "-"
+    else:
+        en_passant = square_name((2 if game.current_turn == "white" else 5, en_passant_file))
+    return (f"{'/'.join(ranks)} {game.current_turn[0]} {castling} {en_passant} "
+            f"{game.halfmove_clock} {fullmove_number}")
+
+def encode_position(game):
+    """Pack the game's current position into POSITION_SIZE bytes (see the module docstring)"""
+    occupancy = 0
+    codes = bytearray(16)
+    count = 0
+    for row, pieces in enumerate(game.board.board):
+        for col, piece in enumerate(pieces):
+            if piece is None:
+                continue
+            if count == 32:
+                raise ValueError("Cannot pack a position with more than 32 pieces")
+            occupancy |= 1 << (row * 8 + col)
+            code = PIECE_CODES[piece.__class__] | (BLACK_CODE if piece.color == "black" else 0)
+            codes[count >> 1] |= code << (4 * (count & 1))
+            count += 1
+    
+    flags = (game.current_turn == "black") | game.board.castling_rights() << 1
+    en_passant_file = _double_push_file(game)
+    return POSITION.pack(occupancy, bytes(codes), flags,
+                         0 if en_passant_file is None else en_passant_file + 1,
+                         min(game.halfmove_clock, 255))
+
+def decode_position(data, board_class=Board):
+    """Build a Game from a position packed by encode_position"""
+    occupancy, codes, flags, en_passant, halfmove_clock = POSITION.unpack(data)
+    board = board_class(setup=False)
+    count = 0
+    while occupancy:
+        square = (occupancy & -occupancy).bit_length() - 1
+        occupancy &= occupancy - 1
+        code = codes[count >> 1] >> (4 * (count & 1)) & 0xF
+        piece_type = PACKED_PIECES[code & 7] if code & 7 < len(PACKED_PIECES) else None
+        if piece_type is None:
+            raise ValueError(f"Invalid packed piece code: {code}")
+        _place(board, piece_type, "black" if code & BLACK_CODE else "white", divmod(square, 8))
+        count += 1
+    return _make_game(board, "black" if flags & 1 else "white", flags >> 1 & 0xF,
+                      en_passant - 1 if en_passant else None, halfmove_clock)
+
+def _place(board, piece_type, color, position):
+    piece = piece_type(color, position)
+    # Only pieces named by the castling rights are treated as unmoved
+    piece.has_moved = not isinstance(piece, Pawn) or position[0] != (6 if color == "white" else 1)
+    board.set_piece(position, piece)
+
+def _make_game(board, turn, rights, en_passant_file, halfmove_clock):
+    """Wrap a freshly placed board in a Game with the rest of the state a FEN records"""
+    for right, king_pos, rook_pos in CASTLING_RIGHTS:
+        if rights & right:
+            color = "white" if king_pos[0] == 7 else "black"
+            for position, piece_type in ((king_pos, King), (rook_pos, Rook)):
+                piece = board.get_piece(position)
+                if isinstance(piece, piece_type) and piece.color == color:
+                    piece.has_moved = False
+    
+    game = Game(board)
+    game.current_turn = turn
+    game.halfmove_clock = halfmove_clock
+    
+    if en_passant_file is not None:
+        # Recreate the double pawn move that allows the capture
+        direction = 1 if turn == "white" else -1
+        row = 2 if turn == "white" else 5
+        pawn_to = (row + direction, en_passant_file)
+        pawn = board.get_piece(pawn_to)
+        if isinstance(pawn, Pawn) and pawn.color != turn:
+            game.last_move = ((row - direction, en_passant_file), pawn_to, pawn)
+    
+    game.reset_zobrist_key()
+    return game
+
+def _double_push_file(game):
+    """File of the pawn that just advanced two squares, or None"""
+    if not game.last_move:
+        return None
+    last_from, last_to, last_piece = game.last_move
+    if isinstance(last_piece, Pawn) and abs(last_to[0] - last_from[0]) == 2:
+        return last_to[1]
+    return None
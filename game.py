@@ -5,127 +5,176 @@ from pieces.knight import Knight
 from pieces.bishop import Bishop
 from pieces.queen import Queen
 from pieces.king import King
+from board import KNIGHT_OFFSETS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS
+from zobrist import EN_PASSANT_KEYS, BLACK_TO_MOVE_KEY
+from move_cache import LegalMoveCache
+
+# Game states reported by Game.status()
+ONGOING = "ongoing"
+CHECK = "check"
+CHECKMATE = "checkmate"
+STALEMATE = "stalemate"
+REPETITION = "repetition"  # Threefold repetition
+FIFTY_MOVES = "fifty moves"  # Fifty moves by each side without a capture or pawn move
+
+FIFTY_MOVE_PLIES = 100
+
+class GameStatus:
+    """Result of Game.status(): the state of the side to move and its legal moves"""
+    __slots__ = ("state", "in_check", "legal_moves")
+    
+    def __init__(self, state, in_check, legal_moves):
+        self.state = state
+        self.in_check = in_check
+        self.legal_moves = legal_moves  # (from_pos, to_pos) list, or None if not requested
+    
+    @property
+    def is_over(self):
+        return self.state in (CHECKMATE, STALEMATE, REPETITION, FIFTY_MOVES)
+    
+    def __repr__(self):
+        return f"GameStatus({self.state!r})"
 
 class Game:
-    def __init__(self, board):
+    def __init__(self, board, move_cache=None):
         self.board = board
+        # Legal moves per position, shared by the UI and the game status checks
+        self.move_cache = move_cache if move_cache is not None else LegalMoveCache()
         self.current_turn = "white"
-        self.move_history = []
+        self.move_history = []  # (from_pos, to_pos, promotion) per move played, in order
         self.last_move = None  # Track last move for en passant
+        self.halfmove_clock = 0  # Plies since the last capture or pawn move
+        # (MoveUndo, previous last_move, Zobrist key, halfmove clock, reversible plies) per move played
+        self._undo_stack = []
+        self.reset_zobrist_key()
     
     def toggle_turn(self):
         self.current_turn = "black" if self.current_turn == "white" else "white"
+        self.board.zobrist_key ^= BLACK_TO_MOVE_KEY
+    
+    def reset_zobrist_key(self):
+        """Recompute board.zobrist_key from scratch, including side to move and en passant"""
+        key = self.board.reset_zobrist_key()
+        if self.current_turn == "black":
+            key ^= BLACK_TO_MOVE_KEY
+        en_passant_file = self._en_passant_file()
+        if en_passant_file is not None:
+            key ^= EN_PASSANT_KEYS[en_passant_file]
+        self.board.zobrist_key = key
+        # Repetitions are only looked for among the keys since the last
+        # capture, pawn move or change of castling rights
+        self._position_keys = [key]
+        self._reversible_plies = 0
+        return key
+    
+    def clone(self):
+        """Independent copy of the current position, e.g. to analyse on another thread.
+        
+        The copy has its own board and move cache and starts with no moves to take back.
+        """
+        game = Game(self.board.clone(), LegalMoveCache(self.move_cache.capacity))
+        game.current_turn = self.current_turn
+        if self.last_move:
+            # Point at the copied piece, unless it has since changed (promotion)
+            last_from, last_to, last_piece = self.last_move
+            piece = game.board.get_piece(last_to)
+            if piece is None or piece.__class__ is not last_piece.__class__:
+                piece = last_piece
+            game.last_move = (last_from, last_to, piece)
+        game.reset_zobrist_key()
+        # Keep what repetition and fifty-move detection need
+        game.halfmove_clock = self.halfmove_clock
+        game.set_position_history(self.position_history())
+        return game
+    
+    def position_history(self):
+        """Zobrist keys of the positions since the last irreversible move, oldest first"""
+        reversible_plies = min(self._reversible_plies, len(self._position_keys) - 1)
+        return tuple(self._position_keys[len(self._position_keys) - 1 - reversible_plies:])
     
-    def make_move(self, from_pos, to_pos):
+    def set_position_history(self, keys):
+        """Restore position_history() on a copy of the same position, e.g. one rebuilt from FEN"""
+        if not keys or keys[-1] != self.board.zobrist_key:
+            raise ValueError("Position history does not end in the current position")
+        self._position_keys = list(keys)
+        self._reversible_plies = len(keys) - 1
+    
+    def _en_passant_file(self):
+        """File of a pawn that can be captured en passant right now, or None"""
+        if not self.last_move:
+            return None
+        
+        last_from, last_to, last_piece = self.last_move
+        if not isinstance(last_piece, Pawn) or abs(last_to[0] - last_from[0]) != 2:
+            return None
+        
+        # Only hash the file when an enemy pawn stands ready to capture
+        row, col = last_to
+        for capture_col in (col - 1, col + 1):
+            piece = self.board.get_piece((row, capture_col))
+            if isinstance(piece, Pawn) and piece.color != last_piece.color:
+                return col
+        return None
+    
+    def make_move(self, from_pos, to_pos, promotion=None):
         piece = self.board.get_piece(from_pos)
         if not piece or piece.color != self.current_turn:
             return False
         
-        # Handle special moves
-        
-        # Castling
-        if self._is_castling_move(from_pos, to_pos):
-            return self._handle_castling(from_pos, to_pos)
-        
-        # En passant
-        if self._is_en_passant_move(from_pos, to_pos):
-            return self._handle_en_passant(from_pos, to_pos)
-        
-        # Validate the move is legal
+        # Validate the move is legal (castling and en passant included)
         valid_moves = self.get_valid_moves(from_pos)
         if to_pos not in valid_moves:
             return False
         
-        # Move the piece
-        self.board.move_piece(from_pos, to_pos)
-        
-        # Update last move for en passant
-        self.last_move = (from_pos, to_pos, piece)
-        
-        # Switch turns
-        self.toggle_turn()
-        
+        self.apply_move(from_pos, to_pos, promotion)
         return True
     
-    def _is_castling_move(self, from_pos, to_pos):
+    def apply_move(self, from_pos, to_pos, promotion=None):
+        """Play a move known to be legal without validating it (see unmake_move)"""
         piece = self.board.get_piece(from_pos)
-        if not isinstance(piece, King):
-            return False
+        zobrist_key = self.board.zobrist_key
+        en_passant_file = self._en_passant_file()
+        undo = self.board.make_move(from_pos, to_pos, promotion)
+        self._undo_stack.append((undo, self.last_move, zobrist_key, self.halfmove_clock,
+                                 self._reversible_plies))
+        self.move_history.append((from_pos, to_pos, promotion))
         
-        # Check if king is moving two squares horizontally
-        return abs(to_pos[1] - from_pos[1]) == 2 and from_pos[0] == to_pos[0]
-    
-    def _handle_castling(self, from_pos, to_pos):
-        row, from_col = from_pos
-        _, to_col = to_pos
-        
-        # Determine if it's kingside or queenside castling
-        is_kingside = to_col > from_col
-        
-        # Get the rook position
-        rook_col = 7 if is_kingside else 0
-        rook_pos = (row, rook_col)
-        
-        # Move the king
-        king = self.board.get_piece(from_pos)
-        self.board.set_piece(to_pos, king)
-        self.board.set_piece(from_pos, None)
-        king.has_moved = True
-        
-        # Move the rook
-        rook = self.board.get_piece(rook_pos)
-        new_rook_col = 5 if is_kingside else 3
-        self.board.set_piece((row, new_rook_col), rook)
-        self.board.set_piece(rook_pos, None)
-        rook.has_moved = True
+        # Update last move for en passant
+        self.last_move = (from_pos, to_pos, piece)
         
-        # Update last move
-        self.last_move = (from_pos, to_pos, king)
+        # Swap the en passant file in the Zobrist key
+        if en_passant_file is not None:
+            self.board.zobrist_key ^= EN_PASSANT_KEYS[en_passant_file]
+        en_passant_file = self._en_passant_file()
+        if en_passant_file is not None:
+            self.board.zobrist_key ^= EN_PASSANT_KEYS[en_passant_file]
         
         # Switch turns
         self.toggle_turn()
         
-        return True
+        if undo.captured or isinstance(piece, Pawn):
+            self.halfmove_clock = 0
+            self._reversible_plies = 0
+        else:
+            self.halfmove_clock += 1
+            if undo.castling_rights != self.board._castling_rights:
+                self._reversible_plies = 0
+            else:
+                self._reversible_plies += 1
+        self._position_keys.append(self.board.zobrist_key)
     
-    def _is_en_passant_move(self, from_pos, to_pos):
-        piece = self.board.get_piece(from_pos)
-        if not isinstance(piece, Pawn):
+    def unmake_move(self):
+        """Take back the most recent move; returns False if there is none"""
+        if not self._undo_stack:
             return False
         
-        # Check if pawn is moving diagonally to an empty square
-        from_row, from_col = from_pos
-        to_row, to_col = to_pos
-        
-        if abs(from_col - to_col) == 1 and ((piece.color == "white" and from_row - to_row == 1) or 
-                                            (piece.color == "black" and to_row - from_row == 1)):
-            # Check if the destination is empty
-            if not self.board.get_piece(to_pos):
-                # Check if there's an enemy pawn that just made a double move
-                if self.last_move:
-                    last_from, last_to, last_piece = self.last_move
-                    if isinstance(last_piece, Pawn) and abs(last_to[0] - last_from[0]) == 2:
-                        # The pawn is adjacent to the moving pawn
-                        if last_to[0] == from_row and last_to[1] == to_col:
-                            return True
-        return False
-    
-    def _handle_en_passant(self, from_pos, to_pos):
-        pawn = self.board.get_piece(from_pos)
-        to_row, to_col = to_pos
-        
-        # Remove the captured pawn
-        captured_row = from_pos[0]  # The row of the capturing pawn
-        self.board.set_piece((captured_row, to_col), None)
-        
-        # Move the pawn
-        self.board.move_piece(from_pos, to_pos)
-        
-        # Update last move
-        self.last_move = (from_pos, to_pos, pawn)
-        
-        # Switch turns
+        undo, self.last_move, zobrist_key, self.halfmove_clock, self._reversible_plies = \
+            self._undo_stack.pop()
+        self.move_history.pop()
+        self._position_keys.pop()
+        self.board.unmake_move(undo)
         self.toggle_turn()
-        
+        self.board.zobrist_key = zobrist_key
         return True
     
     def get_valid_moves(self, position):
@@ -133,52 +182,184 @@ class Game:
         if not piece:
             return []
         
-        potential_moves = piece.get_valid_moves(self.board)
-        valid_moves = []
+        if piece.color == self.current_turn:
+            moves, _ = self._position_info()
+            return [to_pos for from_pos, to_pos in moves if from_pos == position]
         
-        # Filter moves that would put/leave the king in check
-        for move in potential_moves:
-            # Create a temporary board to simulate the move
-            temp_board = self.board.clone()
-            temp_board.move_piece(position, move)
+        king_pos, checkers, evasions, pins = self._find_checks_and_pins(piece.color)
+        return self._legal_moves_for(piece, king_pos, checkers, evasions, pins)
+    
+    def book_moves(self, book):
+        """Weighted ((from_pos, to_pos, promotion), weight) moves from an opening book"""
+        return book.moves(self)
+    
+    def get_all_valid_moves(self, color=None):
+        """All legal (from_pos, to_pos) moves for a color, the side to move by default"""
+        if color is None or color == self.current_turn:
+            moves, _ = self._position_info()
+            return list(moves)
+        return list(self._generate_legal_moves(color))
+    
+    def _position_info(self):
+        """(legal moves, in check) for the side to move, through the move cache"""
+        key = self.board.zobrist_key
+        entry = self.move_cache.get(key)
+        if entry is None:
+            color = self.current_turn
+            king_pos, checkers, evasions, pins = self._find_checks_and_pins(color)
+            moves = [(piece.position, move)
+                     for piece in self.board.get_pieces(color)
+                     for move in self._legal_moves_for(piece, king_pos, checkers, evasions, pins)]
+            entry = (moves, bool(checkers))
+            self.move_cache.put(key, moves, entry[1])
+        return entry
+    
+    def _generate_legal_moves(self, color):
+        """Yield legal (from_pos, to_pos) moves lazily, so callers can stop at the first"""
+        king_pos, checkers, evasions, pins = self._find_checks_and_pins(color)
+        for piece in self.board.get_pieces(color):
+            position = piece.position
+            for move in self._legal_moves_for(piece, king_pos, checkers, evasions, pins):
+                yield position, move
+    
+    def _find_checks_and_pins(self, color):
+        """Find what is checking and pinning the king of the given color.
+        
+        Returns (king_pos, checkers, evasions, pins): checkers lists the
+        positions of checking pieces, evasions is the set of squares a non-king
+        move must land on to answer a single check (None when not in check),
+        and pins maps each pinned piece's position to the squares on its pin ray.
+        """
+        board = self.board
+        enemy_color = "black" if color == "white" else "white"
+        king_pos = board.find_king(color)
+        checkers = []
+        evasions = None
+        pins = {}
+        if not king_pos:
+            return king_pos, checkers, evasions, pins
+        row, col = king_pos
+        
+        # Knight and pawn checks can only be answered by capturing the checker
+        for dr, dc in KNIGHT_OFFSETS:
+            piece = board.get_piece((row + dr, col + dc))
+            if isinstance(piece, Knight) and piece.color == enemy_color:
+                checkers.append(piece.position)
+                evasions = {piece.position}
+        pawn_row = row - 1 if color == "white" else row + 1
+        for pawn_col in (col - 1, col + 1):
+            piece = board.get_piece((pawn_row, pawn_col))
+            if isinstance(piece, Pawn) and piece.color == enemy_color:
+                checkers.append(piece.position)
+                evasions = {piece.position}
+        
+        # Walk each ray out from the king: an enemy slider behind nothing is
+        # giving check, behind exactly one friendly piece it is pinning it
+        for directions, slider in ((ROOK_DIRECTIONS, Rook), (BISHOP_DIRECTIONS, Bishop)):
+            for dr, dc in directions:
+                ray = []
+                shield = None
+                r, c = row + dr, col + dc
+                while 0 <= r < 8 and 0 <= c < 8:
+                    ray.append((r, c))
+                    piece = board.board[r][c]
+                    if piece:
+                        if piece.color == color:
+                            if shield:
+                                break
+                            shield = piece
+                        else:
+                            if isinstance(piece, (slider, Queen)):
+                                if shield:
+                                    pins[shield.position] = set(ray)
+                                else:
+                                    checkers.append(piece.position)
+                                    evasions = set(ray)
+                            break
+                    r += dr
+                    c += dc
+        
+        # In double check only the king can move
+        if len(checkers) > 1:
+            evasions = set()
+        
+        return king_pos, checkers, evasions, pins
+    
+    def _legal_moves_for(self, piece, king_pos, checkers, evasions, pins):
+        """Legal destinations for one piece, given the checks and pins on its king"""
+        position = piece.position
+        
+        if isinstance(piece, King):
+            # Lift the king so squares behind it along a checking ray count as attacked
+            potential_moves = self.board.piece_moves(piece)
+            enemy_color = "black" if piece.color == "white" else "white"
+            self.board.set_piece(position, None)
+            valid_moves = [move for move in potential_moves
+                           if not self.board.is_square_attacked(move, enemy_color)]
+            self.board.set_piece(position, piece)
             
-            # Check if the king is in check after the move
-            king_pos = temp_board.find_king(piece.color)
-            if not king_pos or not self._is_position_under_attack(king_pos, piece.color, temp_board):
-                valid_moves.append(move)
+            # Castling
+            if not checkers and not piece.has_moved:
+                valid_moves.extend(self._get_castling_moves(position))
+            return valid_moves
+        
+        if len(checkers) > 1:
+            return []
         
-        # Add special moves
+        valid_moves = self.board.piece_moves(piece)
         
-        # Castling
-        if isinstance(piece, King) and not piece.has_moved:
-            valid_moves.extend(self._get_castling_moves(position))
+        # A pinned piece stays on its pin ray; in check, every move must block or capture
+        allowed = pins.get(position)
+        if evasions is not None:
+            allowed = evasions if allowed is None else allowed & evasions
+        if allowed is not None:
+            valid_moves = [move for move in valid_moves if move in allowed]
         
         # En passant
         if isinstance(piece, Pawn):
-            en_passant_moves = self._get_en_passant_moves(position)
-            for move in en_passant_moves:
-                # Create a temporary board to simulate the move
-                temp_board = self.board.clone()
-                # Need to handle en passant specially in simulation
-                from_row, from_col = position
-                to_row, to_col = move
-                
-                # Move the pawn
-                temp_board.move_piece(position, move)
-                
-                # Remove the captured pawn
-                temp_board.set_piece((from_row, to_col), None)
-                
-                # Check if the king is in check after the move
-                king_pos = temp_board.find_king(piece.color)
-                if not king_pos or not self._is_position_under_attack(king_pos, piece.color, temp_board):
+            for move in self._get_en_passant_moves(position):
+                if self._is_legal_en_passant(piece, move, king_pos, checkers, evasions, pins):
                     valid_moves.append(move)
         
         return valid_moves
     
+    def _is_legal_en_passant(self, pawn, to_pos, king_pos, checkers, evasions, pins):
+        """En passant removes two pawns from the board at once, so check it specially"""
+        from_pos = pawn.position
+        captured_pos = (from_pos[0], to_pos[1])
+        
+        # Answering check: capture the pawn that just gave it, or block with the move
+        if checkers and captured_pos != checkers[0] and to_pos not in evasions:
+            return False
+        if from_pos in pins and to_pos not in pins[from_pos]:
+            return False
+        if not king_pos:
+            return True
+        
+        # Discovered check through the captured pawn's square, e.g. both pawns
+        # leaving the king's rank at once and exposing it to a rook
+        dr = captured_pos[0] - king_pos[0]
+        dc = captured_pos[1] - king_pos[1]
+        if dr != 0 and dc != 0 and abs(dr) != abs(dc):
+            return True
+        step_r = (dr > 0) - (dr < 0)
+        step_c = (dc > 0) - (dc < 0)
+        slider = Rook if dr == 0 or dc == 0 else Bishop
+        r, c = king_pos[0] + step_r, king_pos[1] + step_c
+        while 0 <= r < 8 and 0 <= c < 8:
+            if (r, c) == to_pos:
+                return True
+            piece = self.board.board[r][c]
+            if piece and (r, c) != from_pos and (r, c) != captured_pos:
+                return piece.color == pawn.color or not isinstance(piece, (slider, Queen))
+            r += step_r
+            c += step_c
+        return True
+    
     def _get_castling_moves(self, king_pos):
         king = self.board.get_piece(king_pos)
-        if not isinstance(king, King) or king.has_moved or self.is_in_check(king.color):
+        if (not isinstance(king, King) or king.has_moved
+                or self._is_position_under_attack(king_pos, king.color)):
             return []
         
         castling_moves = []
@@ -269,55 +450,94 @@ class Game:
             board = self.board
         
         enemy_color = "black" if color == "white" else "white"
-        
-        # Check for attacks from all enemy pieces
-        for row in range(8):
-            for col in range(8):
-                piece = board.get_piece((row, col))
-                if piece and piece.color == enemy_color:
-                    # Don't check for castling or en passant here to avoid recursion
-                    moves = piece.get_valid_moves(board, check_castling=False, check_en_passant=False)
-                    if position in moves:
-                        return True
-        
-        return False
+        return board.is_square_attacked(position, enemy_color)
     
     def is_in_check(self, color):
         """Check if the king of the given color is in check"""
+        if color == self.current_turn:
+            _, in_check = self._position_info()
+            return in_check
+        
         king_pos = self.board.find_king(color)
         if not king_pos:
             return False
         
         return self._is_position_under_attack(king_pos, color)
     
+    def repetition_count(self):
+        """How many times the current position has occurred, this time included.
+        
+        Only positions since the last irreversible move can repeat it, so at
+        most every other one of those keys is compared.
+        """
+        keys = self._position_keys
+        key = keys[-1]
+        count = 1
+        for index in range(len(keys) - 3, len(keys) - 2 - self._reversible_plies, -2):
+            if keys[index] == key:
+                count += 1
+        return count
+    
+    def is_threefold_repetition(self):
+        return self.repetition_count() >= 3
+    
+    def is_fifty_move_draw(self):
+        return self.halfmove_clock >= FIFTY_MOVE_PLIES
+    
+    def status(self, with_moves=True):
+        """Ongoing, check, checkmate, stalemate or a draw by repetition or the
+        fifty-move rule for the side to move, in one pass.
+        
+        The legal moves found along the way come back in legal_moves, so the
+        caller does not need to generate them again. With with_moves=False,
+        generation stops at the first legal move instead (unless the position
+        is already cached) and legal_moves is None.
+        """
+        if with_moves:
+            moves, in_check = self._position_info()
+            has_moves = bool(moves)
+            legal_moves = list(moves)
+        else:
+            entry = self.move_cache.get(self.board.zobrist_key)
+            if entry is not None:
+                in_check, has_moves = entry[1], bool(entry[0])
+            else:
+                king_pos, checkers, evasions, pins = self._find_checks_and_pins(self.current_turn)
+                in_check = bool(checkers)
+                has_moves = any(self._legal_moves_for(piece, king_pos, checkers, evasions, pins)
+                                for piece in self.board.get_pieces(self.current_turn))
+            legal_moves = None
+        
+        if has_moves:
+            # Checkmate on the hundredth ply still counts, so draws are only checked here
+            if self.halfmove_clock >= FIFTY_MOVE_PLIES:
+                state = FIFTY_MOVES
+            elif self.repetition_count() >= 3:
+                state = REPETITION
+            else:
+                state = CHECK if in_check else ONGOING
+        else:
+            state = CHECKMATE if in_check else STALEMATE
+        return GameStatus(state, in_check, legal_moves)
+    
     def is_checkmate(self, color):
         """Check if the given color is in checkmate"""
+        if color == self.current_turn:
+            return self.status(with_moves=False).state == CHECKMATE
+        
         if not self.is_in_check(color):
             return False
         
         # Check if any piece can make a move that gets out of check
-        for row in range(8):
-            for col in range(8):
-                piece = self.board.get_piece((row, col))
-                if piece and piece.color == color:
-                    valid_moves = self.get_valid_moves((row, col))
-                    if valid_moves:
-                        return False
-        
-        return True
+        return next(self._generate_legal_moves(color), None) is None
     
     def is_stalemate(self, color):
         """Check if the given color is in stalemate"""
+        if color == self.current_turn:
+            return self.status(with_moves=False).state == STALEMATE
+        
         if self.is_in_check(color):
             return False
         
         # Check if any piece can make a valid move
-        for row in range(8):
-            for col in range(8):
-                piece = self.board.get_piece((row, col))
-                if piece and piece.color == color:
-                    valid_moves = self.get_valid_moves((row, col))
-                    if valid_moves:
-                        return False
-        
-        return True
\ No newline at end of file
+        return next(self._generate_legal_moves(color), None) is None
\ No newline at end of file
@@ -1,7 +1,12 @@
+import argparse
 import pygame
 import sys
 from board import Board
-from game import Game
+from game import Game, CHECKMATE, STALEMATE, REPETITION, FIFTY_MOVES
+from renderer import BoardRenderer
+from analysis_worker import AnalysisWorker, ANALYSIS_DONE, STATUS, HINT
+from profiler import FrameProfiler, RulesCounters, draw_overlay
+from book import OpeningBook
 
 # Initialize pygame
 pygame.init()
@@ -12,120 +17,182 @@ SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 800
 BOARD_SIZE = 8
 SQUARE_SIZE = SCREEN_WIDTH // BOARD_SIZE
-FPS = 60
+MIN_SQUARE_SIZE = 20
+HINT_TIME_MS = 3000  # Thinking time for a suggested move
+PROFILE_REFRESH_MS = 500  # How often the profiling overlay updates while idle
+PROFILE_TICK = pygame.USEREVENT + 2
+
+# What the player chose on the game-over screen
+RESTART = "restart"
+QUIT = "quit"
 
 # Colors
 WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-HIGHLIGHT_COLOR = (100, 249, 83, 180)  # Semi-transparent green
-LAST_MOVE_COLOR = (250, 240, 80, 180)  # Semi-transparent yellow
+CHECK_COLOR = (255, 0, 0)
 
 # Create window
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
 pygame.display.set_caption("Chess Game")
-clock = pygame.time.Clock()
+# Nothing uses mouse motion; blocking it keeps the idle loop asleep
+pygame.event.set_blocked(pygame.MOUSEMOTION)
 
 # Font for messages
 font = pygame.font.SysFont("Arial", 36)
+profile_font = pygame.font.SysFont("monospace", 14)
 
 # Load move sound
 move_sound = pygame.mixer.Sound('assets/move.wav')
 
-def draw_board(board, selected_piece, valid_moves, last_move):
-    # Draw squares
-    for row in range(BOARD_SIZE):
-        for col in range(BOARD_SIZE):
-            color = WHITE if (row + col) % 2 == 0 else (120, 120, 120)
-            pygame.draw.rect(screen, color, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-            
-            # Highlight last move
-            if last_move and ((row, col) == last_move[0] or (row, col) == last_move[1]):
-                highlight = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-                highlight.fill(LAST_MOVE_COLOR)
-                screen.blit(highlight, (col * SQUARE_SIZE, row * SQUARE_SIZE))
-                
-    # Highlight selected piece and valid moves
-    if selected_piece:
-        row, col = selected_piece
-        highlight = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-        highlight.fill(HIGHLIGHT_COLOR)
-        screen.blit(highlight, (col * SQUARE_SIZE, row * SQUARE_SIZE))
-        
-        # Highlight valid moves
-        for move in valid_moves:
-            move_row, move_col = move
-            highlight = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-            highlight.fill(HIGHLIGHT_COLOR)
-            screen.blit(highlight, (move_col * SQUARE_SIZE, move_row * SQUARE_SIZE))
-    
-    # Draw pieces
-    for row in range(BOARD_SIZE):
-        for col in range(BOARD_SIZE):
-            piece = board.get_piece((row, col))
-            if piece:
-                piece_image = piece.image
-                # Center the piece in the square
-                image_rect = piece_image.get_rect()
-                image_rect.center = (col * SQUARE_SIZE + SQUARE_SIZE // 2, row * SQUARE_SIZE + SQUARE_SIZE // 2)
-                screen.blit(piece_image, image_rect)
-
 def show_message(message):
+    """Show a game-over message until the player restarts or quits; returns RESTART or QUIT"""
+    screen = pygame.display.get_surface()
+    width, height = screen.get_size()
+    
     # Create semi-transparent overlay
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+    overlay = pygame.Surface((width, height), pygame.SRCALPHA)
     overlay.fill((0, 0, 0, 150))
     screen.blit(overlay, (0, 0))
     
     # Render message
     text = font.render(message, True, WHITE)
-    text_rect = text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
+    text_rect = text.get_rect(center=(width//2, height//2))
     screen.blit(text, text_rect)
     
     # Add instruction to restart
     restart_text = font.render("Press R to restart game", True, WHITE)
-    restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 50))
+    restart_rect = restart_text.get_rect(center=(width//2, height//2 + 50))
     screen.blit(restart_text, restart_rect)
     
     pygame.display.flip()
     
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:
-                    return True  # Restart the game
-                elif event.key == pygame.K_q:
-                    pygame.quit()
-                    sys.exit()
-    return False
+    # Sleep until a key or quit instead of polling
+    while True:
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            return QUIT
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_r:
+                return RESTART
+            elif event.key == pygame.K_q:
+                return QUIT
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play chess")
+    parser.add_argument("--profile-log", help="append per-frame timings and rules-core counters "
+                                              "to this file as JSON lines")
+    parser.add_argument("--book", help="opening book to suggest moves from before asking the engine")
+    args = parser.parse_args(argv)
+    book = OpeningBook(args.book) if args.book else None
+    
     board = Board()
     game = Game(board)
     selected_piece = None
     valid_moves = []
     game_over = False
     last_move = None
+    renderer = BoardRenderer(screen, SQUARE_SIZE, font)
+    
+    # Status checks and hints run on a worker thread so the loop never stalls;
+    # a short GIL switch interval lets this thread back in within a frame
+    sys.setswitchinterval(0.001)
+    worker = AnalysisWorker()
+    status = None  # Latest GameStatus from the worker for the current position
+    hint_move = None
+    worker.request_status(game)
+    
+    # Profiling: F3 toggles the overlay; with a log file, counting starts right away
+    profile_log = open(args.profile_log, "a") if args.profile_log else None
+    profiler = FrameProfiler(profile_log)
+    counters = RulesCounters()
+    show_profile = False
+    if profile_log:
+        counters.install()
+    
+    def quit_game():
+        # Every way out goes through here so the worker stops and the log is complete
+        worker.shutdown()
+        if profile_log:
+            profile_log.close()
+        pygame.quit()
+        sys.exit()
     
     while True:
-        for event in pygame.event.get():
+        # Display whose turn it is and check status
+        labels = [(f"{game.current_turn.capitalize()}'s Turn", WHITE, (10, 10))]
+        if status and status.in_check and not game_over:
+            labels.append(("CHECK!", CHECK_COLOR, (BOARD_SIZE * renderer.square_size - 150, 10)))
+        panel = None
+        if show_profile:
+            overlay = draw_overlay(profiler, counters, profile_font)
+            panel = (overlay, (10, BOARD_SIZE * renderer.square_size - overlay.get_height() - 10))
+        
+        # Redraw only the squares that changed
+        dirty_rects = renderer.render(board, selected_piece, valid_moves, last_move, hint_move, labels,
+                                      panel)
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+        profiler.lap("render")
+        profiler.end_frame(counters if counters.installed else None)
+        
+        # Sleep until something happens: input, a worker result or the window needing a repaint
+        events = [pygame.event.wait()] + pygame.event.get()
+        profiler.begin_frame()
+        for event in events:
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                quit_game()
+            
+            # Results from the worker; anything from before the last cancel is stale
+            if event.type == ANALYSIS_DONE and event.generation == worker.generation:
+                profiler.record_background(event.kind, event.elapsed)
+                if event.kind == HINT:
+                    hint_move = event.result.move
+                elif event.kind == STATUS:
+                    status = event.result
+                    counters.mark_move()
+                    choice = None
+                    
+                    # Check for game over conditions
+                    if status.state == CHECKMATE:
+                        game_over = True
+                        winner = "White" if game.current_turn == "black" else "Black"
+                        choice = show_message(f"Checkmate! {winner} wins!")
+                    elif status.state == STALEMATE:
+                        game_over = True
+                        choice = show_message("Stalemate! The game is a draw.")
+                    elif status.state == REPETITION:
+                        game_over = True
+                        choice = show_message("Threefold repetition! The game is a draw.")
+                    elif status.state == FIFTY_MOVES:
+                        game_over = True
+                        choice = show_message("Fifty-move rule! The game is a draw.")
+                    
+                    if choice == QUIT:
+                        quit_game()
+                    if choice == RESTART:
+                        renderer.invalidate()
+                        worker.cancel()
+                        board = Board()
+                        game = Game(board)
+                        selected_piece = None
+                        valid_moves = []
+                        game_over = False
+                        last_move = None
+                        status = None
+                        hint_move = None
+                        worker.request_status(game)
                 
             if not game_over:
                 if event.type == pygame.MOUSEBUTTONDOWN:
-                    col = event.pos[0] // SQUARE_SIZE
-                    row = event.pos[1] // SQUARE_SIZE
+                    col = event.pos[0] // renderer.square_size
+                    row = event.pos[1] // renderer.square_size
+                    if row >= BOARD_SIZE or col >= BOARD_SIZE:
+                        continue  # Outside the board in a non-square window
                     
                     # If a piece is already selected
                     if selected_piece:
                         # Check if the clicked position is a valid move
                         if (row, col) in valid_moves:
                             # Move the piece
-                            piece = board.get_piece(selected_piece)
                             old_pos = selected_piece
                             new_pos = (row, col)
                             
@@ -136,28 +203,11 @@ def main():
                                 move_sound.play()
                                 last_move = (old_pos, new_pos)
                                 
-                                # Check for game over conditions
-                                if game.is_checkmate(game.current_turn):
-                                    game_over = True
-                                    winner = "White" if game.current_turn == "black" else "Black"
-                                    restart = show_message(f"Checkmate! {winner} wins!")
-                                    if restart:
-                                        board = Board()
-                                        game = Game(board)
-                                        selected_piece = None
-                                        valid_moves = []
-                                        game_over = False
-                                        last_move = None
-                                elif game.is_stalemate(game.current_turn):
-                                    game_over = True
-                                    restart = show_message("Stalemate! The game is a draw.")
-                                    if restart:
-                                        board = Board()
-                                        game = Game(board)
-                                        selected_piece = None
-                                        valid_moves = []
-                                        game_over = False
-                                        last_move = None
+                                # Evaluate the new position in the background
+                                worker.cancel()
+                                status = None
+                                hint_move = None
+                                worker.request_status(game)
                         
                         # Reset selection
                         selected_piece = None
@@ -167,32 +217,50 @@ def main():
                         piece = board.get_piece((row, col))
                         if piece and piece.color == game.current_turn:
                             selected_piece = (row, col)
-                            valid_moves = game.get_valid_moves(selected_piece)
+                            if status:
+                                valid_moves = [to_pos for from_pos, to_pos in status.legal_moves
+                                               if from_pos == selected_piece]
+                            else:
+                                valid_moves = game.get_valid_moves(selected_piece)
+                
+                # Suggest a move with 'h': from the book while it lasts, then the engine
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                    book_move = book.choose(game) if book else None
+                    if book_move:
+                        hint_move = book_move[:2]
+                    else:
+                        worker.request_hint(game, HINT_TIME_MS)
             
             # Allow restart with 'r' key anytime
             if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+                worker.cancel()
                 board = Board()
                 game = Game(board)
                 selected_piece = None
                 valid_moves = []
                 game_over = False
                 last_move = None
-        
-        # Draw everything
-        screen.fill(BLACK)
-        draw_board(board, selected_piece, valid_moves, last_move)
-        
-        # Display whose turn it is
-        turn_text = font.render(f"{game.current_turn.capitalize()}'s Turn", True, WHITE)
-        screen.blit(turn_text, (10, 10))
-        
-        # Display check status
-        if game.is_in_check(game.current_turn) and not game_over:
-            check_text = font.render("CHECK!", True, (255, 0, 0))
-            screen.blit(check_text, (SCREEN_WIDTH - 150, 10))
-        
-        pygame.display.flip()
-        clock.tick(FPS)
+                status = None
+                hint_move = None
+                worker.request_status(game)
+            
+            # Toggle the profiling overlay with F3
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                show_profile = not show_profile
+                if show_profile:
+                    counters.install()
+                elif not profile_log:
+                    counters.uninstall()
+                pygame.time.set_timer(PROFILE_TICK, PROFILE_REFRESH_MS if show_profile else 0)
+            
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.invalidate()
+            
+            # Fit the board to the new window; sprites are rescaled once per size
+            if event.type == pygame.VIDEORESIZE:
+                square_size = max(min(event.w, event.h) // BOARD_SIZE, MIN_SQUARE_SIZE)
+                renderer.resize(pygame.display.get_surface(), square_size)
+        profiler.lap("events")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,148 @@
+# metrics.py
+"""Counters and timers for the hot paths of Game and Board.
+
+Nothing is instrumented until a sink is installed. The hooked methods are
+then wrapped in place, and unwrapped again when the last sink for them is
+removed, so a service that never installs a sink pays nothing at all.
+
+    from metrics import Metrics, install
+    metrics = Metrics()
+    install(metrics)
+    ...
+    print(metrics.prometheus())
+
+A sink is anything with an observe(name, seconds) method.
+"""
+import threading
+import time
+
+from board import Board
+from game import Game
+
+# Metric name -> (class, method); subclasses that override a method are wrapped too
+HOOKS = {
+    "game_get_valid_moves": (Game, "get_valid_moves"),
+    "game_is_position_under_attack": (Game, "_is_position_under_attack"),
+    "game_find_checks_and_pins": (Game, "_find_checks_and_pins"),
+    "game_status": (Game, "status"),
+    "game_is_checkmate": (Game, "is_checkmate"),
+    "game_is_stalemate": (Game, "is_stalemate"),
+    "board_clone": (Board, "clone"),
+    "board_move_piece": (Board, "move_piece"),
+    # make_move (with unmake_move) is the path the game and engine actually take
+    "board_make_move": (Board, "make_move"),
+    "board_is_square_attacked": (Board, "is_square_attacked"),
+}
+
+DEFAULT_METRICS = ("game_get_valid_moves", "game_is_position_under_attack", "game_status",
+                   "game_is_checkmate", "game_is_stalemate", "board_clone", "board_move_piece",
+                   "board_make_move")
+
+class Metrics:
+    """Thread-safe call counts and total seconds per metric name"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._seconds = {}
+    
+    def observe(self, name, seconds):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+            self._seconds[name] = self._seconds.get(name, 0.0) + seconds
+    
+    def snapshot(self):
+        """{name: {"count": calls, "seconds": total time}}"""
+        with self._lock:
+            return {name: {"count": count, "seconds": self._seconds[name]}
+                    for name, count in self._counts.items()}
+    
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._seconds.clear()
+    
+    def prometheus(self, prefix="chess"):
+        """Snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [f"# HELP {prefix}_calls_total Calls to instrumented Game and Board methods",
+                 f"# TYPE {prefix}_calls_total counter"]
+        lines += [f'{prefix}_calls_total{{method="{name}"}} {entry["count"]}'
+                  for name, entry in sorted(snapshot.items())]
+        lines += [f"# HELP {prefix}_call_seconds_total Time spent in instrumented Game and Board methods",
+                  f"# TYPE {prefix}_call_seconds_total counter"]
+        lines += [f'{prefix}_call_seconds_total{{method="{name}"}} {entry["seconds"]:.9f}'
+                  for name, entry in sorted(snapshot.items())]
+        return "\n".join(lines) + "\n"
+
+# name -> tuple of sinks observing it, and (class, method) -> original function for
+# wrapped methods. The tuples are replaced rather than changed, so a wrapper running on
+# another thread always sees a consistent set of sinks without taking a lock.
+_sinks = {}
+_originals = {}
+_install_lock = threading.Lock()
+
+def install(sink, names=DEFAULT_METRICS):
+    """Start reporting the given metrics to sink"""
+    with _install_lock:
+        for name in names:
+            if name not in HOOKS:
+                raise ValueError(f"Unknown metric: {name!r}")
+            sinks = _sinks.get(name, ())
+            if sink in sinks:
+                continue
+            _sinks[name] = sinks + (sink,)
+            if not sinks:
+                _wrap(name)
+
+def uninstall(sink):
+    """Stop reporting to sink, unwrapping methods nobody observes any more"""
+    with _install_lock:
+        for name, sinks in list(_sinks.items()):
+            if sink not in sinks:
+                continue
+            sinks = tuple(other for other in sinks if other is not sink)
+            if sinks:
+                _sinks[name] = sinks
+            else:
+                del _sinks[name]
+                _unwrap(name)
+
+def installed_metrics():
+    return sorted(_sinks)
+
+def _hooked_classes(name):
+    base, method = HOOKS[name]
+    classes = [base]
+    for cls in classes:
+        classes.extend(cls.__subclasses__())
+    return [(cls, method) for cls in classes if method in cls.__dict__]
+
+def _wrap(name):
+    for cls, method in _hooked_classes(name):
+        original = cls.__dict__[method]
+        _originals[(cls, method)] = original
+        setattr(cls, method, _timed(name, original))
+
+def _unwrap(name):
+    for cls, method in _hooked_classes(name):
+        original = _originals.pop((cls, method), None)
+        if original is not None:
+            setattr(cls, method, original)
+
+def _timed(name, function):
+    perf_counter = time.perf_counter
+    
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            for sink in _sinks.get(name, ()):
+                sink.observe(name, elapsed)
+    
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    wrapper.__wrapped__ = function
+    return wrapper
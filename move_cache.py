@@ -0,0 +1,46 @@
+# move_cache.py
+from collections import OrderedDict
+
+DEFAULT_CAPACITY = 4096
+
+class LegalMoveCache:
+    """Least-recently-used map from a position's Zobrist key to its legal moves.
+    
+    Entries are (moves, in_check) for the side to move, with moves a tuple of
+    (from_pos, to_pos). The key already covers side to move, castling rights
+    and en passant, so one cache can be shared by several games. A capacity
+    of 0 disables caching.
+    """
+    
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+    
+    def get(self, key):
+        """Return the cached (moves, in_check) for a key, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+    
+    def put(self, key, moves, in_check):
+        """Store an entry, evicting the least recently used one when full"""
+        if self.capacity <= 0:
+            return
+        self._entries[key] = (tuple(moves), in_check)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        return len(self._entries)
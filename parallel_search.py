@@ -0,0 +1,260 @@
+# parallel_search.py
+"""Multi-process analysis built on engine.Engine.
+
+Two ways of spreading one search over several cores:
+
+- Root splitting: every legal move of the position is scored by its own
+  worker, one iterative-deepening depth at a time.
+- Lazy SMP: every worker searches the whole position, with shuffled move
+  orders, sharing what they learn through a hash table in shared memory.
+  
+    python parallel_search.py --depth 5 --workers 1,2,4,8
+    python parallel_search.py --mode root --fen "<fen>" --depth 4
+"""
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+from board import Board
+from engine import Engine, SearchResult, SearchTimeout, INFINITY, MATE_SCORE, MATE_BOUND, MAX_PLY, _move_name
+from fen import STARTING_FEN, load_fen, encode_position, decode_position
+from tt import BUCKET_SIZE, DEFAULT_SIZE_MB, TranspositionTable
+
+LAZY_SMP = "smp"
+ROOT_SPLIT = "root"
+
+class SharedHashTable(TranspositionTable):
+    """Transposition table in shared memory, usable by Engine from any process.
+    
+    Pickling it (e.g. into a worker process) attaches to the same memory.
+    The creating process owns the memory and must call close().
+    """
+    
+    def __init__(self, size_mb=DEFAULT_SIZE_MB):
+        size = max(BUCKET_SIZE, size_mb * 1024 * 1024 // BUCKET_SIZE * BUCKET_SIZE)
+        self._memory = shared_memory.SharedMemory(create=True, size=size)
+        self._owner = True
+        super().__init__(buffer=self._memory.buf)
+        self.clear()
+    
+    def close(self):
+        self._buffer = None
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+    
+    def __getstate__(self):
+        return {"name": self._memory.name}
+    
+    def __setstate__(self, state):
+        self._memory = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+        TranspositionTable.__init__(self, buffer=self._memory.buf)
+
+# Per-process state, set up once by _init_worker
+_table = None
+_stop_event = None
+
+def _init_worker(table, stop_event):
+    global _table, _stop_event
+    _table = table
+    _stop_event = stop_event
+
+def _pack(game):
+    """A game's position for a worker: packed, plus the keys repetitions are found with"""
+    return encode_position(game), game.position_history()
+
+def _unpack(position, board_class):
+    packed, history = position
+    game = decode_position(packed, board_class)
+    game.set_position_history(history)
+    return game
+
+def _search_helper(position, board_class, max_depth, seed, generation):
+    """Lazy SMP: search the whole position until max_depth or the stop signal"""
+    _table.generation = generation
+    engine = Engine(stop_event=_stop_event, tt=_table, seed=seed)
+    return engine.search(_unpack(position, board_class), None, max_depth)
+
+def _score_root_move(position, board_class, move, depth, alpha, generation):
+    """Root splitting: score one root move to depth, from the root side's view.
+    
+    Scores at or below alpha are only upper bounds.
+    """
+    _table.generation = generation
+    engine = Engine(stop_event=_stop_event, tt=_table)
+    game = _unpack(position, board_class)
+    game.apply_move(*move)
+    try:
+        score = -engine.score_position(game, depth - 1, 1, -INFINITY, -alpha)
+    except SearchTimeout:
+        score = None
+    return move, score, engine.nodes
+
+class ParallelSearcher:
+    """Pool of worker processes for searching one position on several cores.
+    
+    Use as a context manager, or call close() when done.
+    """
+    
+    def __init__(self, workers=None, mode=LAZY_SMP, table_mb=DEFAULT_SIZE_MB):
+        if mode not in (LAZY_SMP, ROOT_SPLIT):
+            raise ValueError(f"Unknown search mode: {mode!r}")
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self.table = SharedHashTable(table_mb)
+        self._stop_event = multiprocessing.Event()
+        self._pool = concurrent.futures.ProcessPoolExecutor(
+            self.workers, initializer=_init_worker, initargs=(self.table, self._stop_event))
+    
+    def search(self, game, time_ms=1000, max_depth=MAX_PLY):
+        """Best move for the side to move, as an engine.SearchResult.
+        
+        Searches stop at max_depth or time_ms (None for no limit). nodes is
+        the total over all workers. The game itself is not modified.
+        """
+        self._stop_event.clear()
+        self.table.new_search()
+        deadline = time.perf_counter() + time_ms / 1000.0 if time_ms is not None else None
+        if self.mode == LAZY_SMP:
+            return self._lazy_smp(game, max_depth, deadline)
+        return self._root_split(game, max_depth, deadline)
+    
+    def clear(self):
+        """Forget everything learned in earlier searches"""
+        self.table.clear()
+    
+    def close(self):
+        self._stop_event.set()
+        self._pool.shutdown(cancel_futures=True)
+        self.table.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _lazy_smp(self, game, max_depth, deadline):
+        start = time.perf_counter()
+        # Workers get the position packed, rather than a pickled Game
+        position = _pack(game)
+        # The first worker keeps the engine's own move order; the rest are
+        # shuffled, and every other helper aims a ply deeper
+        futures = []
+        for index in range(self.workers):
+            depth = max_depth if index % 2 == 0 else min(max_depth + 1, MAX_PLY)
+            futures.append(self._pool.submit(_search_helper, position, game.board.__class__, depth,
+                                              index or None,
+                                              self.table.generation))
+        
+        done, _ = concurrent.futures.wait(futures, _remaining(deadline),
+                                          concurrent.futures.FIRST_COMPLETED)
+        self._stop_event.set()
+        results = [future.result() for future in futures]
+        
+        # The deepest completed search wins, preferring whichever finished first
+        finished = [future.result() for future in futures if future in done]
+        best = max(finished or results, key=lambda result: result.depth)
+        return SearchResult(best.move, best.score, best.depth,
+                            sum(result.nodes for result in results), time.perf_counter() - start)
+    
+    def _root_split(self, game, max_depth, deadline):
+        start = time.perf_counter()
+        snapshot = game.clone()
+        root_moves = snapshot.get_all_valid_moves()
+        if not root_moves:
+            score = -MATE_SCORE if snapshot.is_in_check(snapshot.current_turn) else 0
+            return SearchResult(None, score, 0, 0, time.perf_counter() - start)
+        
+        best_move, best_score, completed_depth, nodes = root_moves[0], 0, 0, 0
+        for depth in range(1, max_depth + 1):
+            # The expected best move is scored alone first; its score then
+            # bounds the others, which can all be searched at once
+            first_scores, first_nodes, finished = self._score_moves(
+                snapshot, root_moves[:1], depth, -INFINITY, deadline)
+            nodes += first_nodes
+            if not finished:
+                break
+            alpha = first_scores[root_moves[0]]
+            scores, rest_nodes, finished = self._score_moves(
+                snapshot, root_moves[1:], depth, alpha, deadline)
+            nodes += rest_nodes
+            if not finished:
+                break
+            scores.update(first_scores)
+            
+            # Search the best moves first next time; moves that did not beat
+            # the first one keep their order, as their scores are only bounds
+            root_moves.sort(key=lambda move: max(scores[move], alpha), reverse=True)
+            best_move, best_score, completed_depth = root_moves[0], scores[root_moves[0]], depth
+            if abs(best_score) >= MATE_BOUND:
+                break
+        
+        return SearchResult(best_move, best_score, completed_depth, nodes,
+                            time.perf_counter() - start)
+    
+    def _score_moves(self, game, moves, depth, alpha, deadline):
+        """Score root moves in parallel; returns (scores, nodes, finished)"""
+        generation = self.table.generation
+        position = _pack(game)
+        futures = [self._pool.submit(_score_root_move, position, game.board.__class__, move, depth,
+                                     alpha, generation)
+                   for move in moves]
+        _, pending = concurrent.futures.wait(futures, _remaining(deadline))
+        if pending:
+            self._stop_event.set()
+            for future in pending:
+                future.cancel()
+        scores, nodes = {}, 0
+        for future in futures:
+            if future.cancelled():
+                continue
+            move, score, move_nodes = future.result()
+            nodes += move_nodes
+            scores[move] = score
+        return scores, nodes, not pending
+
+def _remaining(deadline):
+    return max(0.0, deadline - time.perf_counter()) if deadline is not None else None
+
+def benchmark(game, depth, worker_counts, mode=LAZY_SMP):
+    """Time-to-depth for each worker count, as (workers, SearchResult, speedup) rows"""
+    rows = []
+    baseline = None
+    for workers in worker_counts:
+        with ParallelSearcher(workers, mode) as searcher:
+            # Start the worker processes before timing, then forget the warm-up
+            searcher.search(game, None, 1)
+            searcher.clear()
+            result = searcher.search(game, None, depth)
+        if baseline is None:
+            baseline = result.elapsed
+        rows.append((workers, result, baseline / result.elapsed))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark multi-core search time-to-depth")
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to search (default: start)")
+    parser.add_argument("--depth", type=int, default=4, help="depth to search to in plies")
+    parser.add_argument("--workers", default="1,2,4",
+                        help="comma-separated worker counts; the first is the baseline")
+    parser.add_argument("--mode", choices=(LAZY_SMP, ROOT_SPLIT, "both"), default="both")
+    args = parser.parse_args(argv)
+    
+    game = load_fen(args.fen, Board)
+    worker_counts = [int(count) for count in args.workers.split(",")]
+    modes = (LAZY_SMP, ROOT_SPLIT) if args.mode == "both" else (args.mode,)
+    for mode in modes:
+        print(f"{mode}: depth {args.depth} on {os.cpu_count()} cores")
+        for workers, result, speedup in benchmark(game, args.depth, worker_counts, mode):
+            print(f"  workers {workers:3d}  time {result.elapsed:7.2f}s  speedup {speedup:5.2f}x  "
+                  f"nodes {result.nodes:9d}  score {result.score:6d}  best {_move_name(result.move)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
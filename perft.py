@@ -0,0 +1,135 @@
+# perft.py
+"""Count the leaves of the legal move tree to check and time move generation.
+
+    python perft.py                          # reference suite up to depth 3
+    python perft.py --depth 4 --bitboard     # deeper, on the bitboard backend
+    python perft.py --fen "<fen>" --depth 3 --divide
+"""
+import argparse
+import sys
+import time
+
+from board import Board
+from bitboard import BitBoard
+from fen import STARTING_FEN, load_fen, square_name
+from move_cache import LegalMoveCache
+from pieces.pawn import Pawn
+from pieces.rook import Rook
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.queen import Queen
+
+PROMOTION_PIECES = (Queen, Rook, Bishop, Knight)
+
+# (name, FEN, node counts for depth 1, 2, 3, ...)
+POSITIONS = [
+    ("start", STARTING_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+def _load_uncached(fen, board_class):
+    """Load a position with the legal-move cache off, so perft measures generation"""
+    game = load_fen(fen, board_class)
+    game.move_cache = LegalMoveCache(capacity=0)
+    return game
+
+def legal_moves(game):
+    """Legal (from_pos, to_pos, promotion) moves, with every promotion choice listed"""
+    moves = []
+    for from_pos, to_pos in game.get_all_valid_moves():
+        if isinstance(game.board.get_piece(from_pos), Pawn) and to_pos[0] in (0, 7):
+            moves.extend((from_pos, to_pos, piece_type) for piece_type in PROMOTION_PIECES)
+        else:
+            moves.append((from_pos, to_pos, None))
+    return moves
+
+def move_name(move):
+    """Coordinate notation for a move, e.g. "e2e4" or "e7e8q" """
+    from_pos, to_pos, promotion = move
+    suffix = "nbrq"[(Knight, Bishop, Rook, Queen).index(promotion)] if promotion else ""
+    return square_name(from_pos) + square_name(to_pos) + suffix
+
+def perft(game, depth):
+    """Number of leaf positions reached after exactly depth plies"""
+    if depth == 0:
+        return 1
+    moves = legal_moves(game)
+    if depth == 1:
+        return len(moves)
+    
+    nodes = 0
+    for from_pos, to_pos, promotion in moves:
+        game.apply_move(from_pos, to_pos, promotion)
+        nodes += perft(game, depth - 1)
+        game.unmake_move()
+    return nodes
+
+def divide(game, depth):
+    """Perft split by root move, for tracking down which subtree is wrong"""
+    counts = {}
+    for move in legal_moves(game):
+        game.apply_move(*move)
+        counts[move_name(move)] = perft(game, depth - 1)
+        game.unmake_move()
+    return counts
+
+def run_suite(max_depth, board_class=Board):
+    """Run every reference position up to max_depth; returns True if all counts match"""
+    all_match = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, expected_counts in POSITIONS:
+        for depth, expected in enumerate(expected_counts[:max_depth], start=1):
+            game = _load_uncached(fen, board_class)
+            start = time.perf_counter()
+            nodes = perft(game, depth)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+            
+            status = "ok" if nodes == expected else f"FAIL (expected {expected})"
+            all_match = all_match and nodes == expected
+            print(f"{name:<10} depth {depth}: {nodes:>9} nodes {elapsed:8.3f}s "
+                  f"{nodes / max(elapsed, 1e-9):>10.0f} nps  {status}")
+    
+    print(f"Total: {total_nodes} nodes in {total_time:.3f}s "
+          f"({total_nodes / max(total_time, 1e-9):.0f} nps)")
+    return all_match
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft move generation benchmark and correctness check")
+    parser.add_argument("--depth", type=int, default=3, help="search depth in plies (default 3)")
+    parser.add_argument("--fen", help="run a single position instead of the reference suite")
+    parser.add_argument("--divide", action="store_true", help="print node counts per root move")
+    parser.add_argument("--bitboard", action="store_true", help="use the bitboard backend")
+    args = parser.parse_args(argv)
+    board_class = BitBoard if args.bitboard else Board
+    
+    if not args.fen:
+        return 0 if run_suite(args.depth, board_class) else 1
+    
+    game = _load_uncached(args.fen, board_class)
+    start = time.perf_counter()
+    if args.divide:
+        counts = divide(game, args.depth)
+        for name, count in sorted(counts.items()):
+            print(f"{name}: {count}")
+        nodes = sum(counts.values())
+    else:
+        nodes = perft(game, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"Nodes: {nodes}  Time: {elapsed:.3f}s  NPS: {nodes / max(elapsed, 1e-9):.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
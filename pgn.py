@@ -0,0 +1,289 @@
+# pgn.py
+"""Streaming PGN reading and writing, with SAN move notation.
+
+read_games() yields one game at a time from any iterable of lines, so an
+archive of any size is read with constant memory:
+
+    with open("archive.pgn") as f:
+        for record in read_games(f):
+            game = replay(record)    # every move checked by Game.make_move
+    
+    python pgn.py archive.pgn                   # games/s for parsing and replaying
+    python pgn.py --generate 500 random.pgn     # write random games, then benchmark them
+"""
+import argparse
+import random
+import re
+import sys
+import time
+
+from board import Board
+from fen import STARTING_FEN, load_fen, to_fen, square_name, parse_square
+from game import CHECKMATE
+from perft import legal_moves
+from pieces.pawn import Pawn
+from pieces.rook import Rook
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.queen import Queen
+from pieces.king import King
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+LINE_LENGTH = 79  # Movetext lines stay under 80 characters
+
+SAN_PIECES = {"N": Knight, "B": Bishop, "R": Rook, "Q": Queen, "K": King}
+SAN_LETTERS = {piece_type: letter for letter, piece_type in SAN_PIECES.items()}
+
+_SAN = re.compile(r"([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+_TAG = re.compile(r'\[\s*(\w+)\s*"((?:[^"\\]|\\.)*)"\s*\]')
+# A comment runs to its closing brace, or on to later lines without one
+_TOKEN = re.compile(r"\{[^}]*\}?|;.*|[()]|[^\s{}();]+")
+_MOVE_NUMBER = re.compile(r"\d+\.+")
+
+class PgnGame:
+    """One game as read from a PGN file: tag pairs, SAN moves and the result"""
+    __slots__ = ("headers", "moves", "result")
+    
+    def __init__(self, headers=None, moves=None, result="*"):
+        self.headers = headers if headers is not None else {}
+        self.moves = moves if moves is not None else []
+        self.result = result
+    
+    def __repr__(self):
+        return f"PgnGame({self.headers.get('White', '?')!r} - {self.headers.get('Black', '?')!r}, " \
+               f"{len(self.moves)} moves, {self.result!r})"
+
+def san(game, move):
+    """SAN for a legal (from_pos, to_pos, promotion) move in the current position, e.g. "Nbd7+" """
+    from_pos, to_pos, promotion = move
+    piece = game.board.get_piece(from_pos)
+    if isinstance(piece, King) and abs(to_pos[1] - from_pos[1]) == 2:
+        text = "O-O" if to_pos[1] > from_pos[1] else "O-O-O"
+    elif isinstance(piece, Pawn):
+        text = square_name(to_pos)
+        if from_pos[1] != to_pos[1]:
+            text = "abcdefgh"[from_pos[1]] + "x" + text
+        if to_pos[0] in (0, 7):
+            text += "=" + SAN_LETTERS[promotion or Queen]
+    else:
+        # Name the file, rank or square the piece came from only when another
+        # piece of the same kind could also move there
+        rivals = [other for other, target in game.get_all_valid_moves()
+                  if target == to_pos and other != from_pos
+                  and game.board.get_piece(other).__class__ is piece.__class__]
+        origin = ""
+        if rivals:
+            if all(other[1] != from_pos[1] for other in rivals):
+                origin = "abcdefgh"[from_pos[1]]
+            elif all(other[0] != from_pos[0] for other in rivals):
+                origin = str(8 - from_pos[0])
+            else:
+                origin = square_name(from_pos)
+        capture = "x" if game.board.get_piece(to_pos) else ""
+        text = SAN_LETTERS[piece.__class__] + origin + capture + square_name(to_pos)
+    
+    game.apply_move(from_pos, to_pos, promotion)
+    status = game.status()
+    game.unmake_move()
+    # A check can also end the game in a draw, which status() reports instead of CHECK
+    if status.state == CHECKMATE:
+        return text + "#"
+    return text + "+" if status.in_check else text
+
+def parse_san(game, text):
+    """Resolve SAN against the legal moves; returns (from_pos, to_pos, promotion)"""
+    text = text.rstrip("+#!?")
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        king_pos = game.board.find_king(game.current_turn)
+        if king_pos:
+            to_pos = (king_pos[0], king_pos[1] + (2 if len(text) == 3 else -2))
+            if to_pos in game.get_valid_moves(king_pos):
+                return king_pos, to_pos, None
+        raise ValueError(f"Illegal move: {text!r}")
+    
+    match = _SAN.match(text)
+    if not match:
+        raise ValueError(f"Invalid SAN: {text!r}")
+    letter, from_file, from_rank, target, promotion_letter = match.groups()
+    piece_type = SAN_PIECES[letter] if letter else Pawn
+    to_pos = parse_square(target)
+    candidates = [from_pos for from_pos, move_to in game.get_all_valid_moves()
+                  if move_to == to_pos and game.board.get_piece(from_pos).__class__ is piece_type
+                  and (from_file is None or from_pos[1] == "abcdefgh".index(from_file))
+                  and (from_rank is None or from_pos[0] == 8 - int(from_rank))]
+    if len(candidates) != 1:
+        raise ValueError(f"{'Ambiguous' if candidates else 'Illegal'} move: {text!r}")
+    
+    promotion = SAN_PIECES[promotion_letter] if promotion_letter else None
+    if (promotion is not None) != (piece_type is Pawn and to_pos[0] in (0, 7)):
+        raise ValueError(f"Invalid promotion: {text!r}")
+    return candidates[0], to_pos, promotion
+
+def read_games(lines):
+    """Yield a PgnGame for each game in an iterable of PGN lines, such as an open file.
+    
+    Comments, variations, NAGs and move numbers are skipped.
+    """
+    headers, moves = {}, []
+    in_comment = False
+    variation_depth = 0
+    for line in lines:
+        if in_comment:
+            end = line.find("}")
+            if end < 0:
+                continue
+            line = line[end + 1:]
+            in_comment = False
+        
+        stripped = line.strip()
+        if not stripped or stripped[0] == "%":
+            continue
+        if stripped[0] == "[" and variation_depth == 0:
+            if moves:
+                # Movetext without a result: the next game's tags close it
+                yield PgnGame(headers, moves)
+                headers, moves = {}, []
+            match = _TAG.match(stripped)
+            if match:
+                headers[match.group(1)] = match.group(2).replace('\\"', '"').replace("\\\\", "\\")
+            continue
+        
+        # Most movetext lines hold nothing but moves
+        plain = "{" not in stripped and ";" not in stripped and "(" not in stripped and ")" not in stripped
+        for token in stripped.split() if plain else _TOKEN.findall(stripped):
+            if token[0] == "{":
+                in_comment = token[-1] != "}" or len(token) == 1
+            elif token[0] == ";":
+                break
+            elif token == "(":
+                variation_depth += 1
+            elif token == ")":
+                variation_depth = max(variation_depth - 1, 0)
+            elif variation_depth or token[0] == "$":
+                continue
+            elif token in RESULTS:
+                yield PgnGame(headers, moves, token)
+                headers, moves = {}, []
+            else:
+                move = _MOVE_NUMBER.sub("", token, 1) if token[0].isdigit() else token
+                if move:
+                    moves.append(move)
+    if moves or headers:
+        yield PgnGame(headers, moves)
+
+def replay(record, board_class=Board):
+    """Play a PgnGame's moves through Game.make_move; returns the finished Game"""
+    game = load_fen(record.headers.get("FEN", STARTING_FEN), board_class)
+    for ply, text in enumerate(record.moves):
+        try:
+            move = parse_san(game, text)
+        except ValueError as error:
+            raise ValueError(f"Move {ply // 2 + 1}{'.' if ply % 2 == 0 else '...'} {error}") from None
+        if not game.make_move(*move):
+            raise ValueError(f"Move {ply // 2 + 1}: illegal move {text!r}")
+    return game
+
+def game_to_pgn(game, headers=None, result=None):
+    """PGN text for the moves played in a game (its move_history).
+    
+    The result is the result argument, else a Result in headers (e.g. for a
+    resignation), else the game's own outcome, or "*" while it is going on.
+    Positions that did not start from the initial array get FEN and SetUp tags.
+    """
+    history = list(game.move_history)
+    for _ in history:
+        game.unmake_move()
+    start_fen = to_fen(game)
+    first_ply = 0 if game.current_turn == "white" else 1
+    tokens = []
+    for ply, move in enumerate(history, first_ply):
+        if ply % 2 == 0:
+            tokens.append(f"{ply // 2 + 1}.")
+        elif ply == first_ply:
+            tokens.append(f"{ply // 2 + 1}...")
+        tokens.append(san(game, move))
+        game.apply_move(*move)
+    
+    if result is None and headers:
+        result = headers.get("Result")
+    if result is None:
+        status = game.status(with_moves=False)
+        if status.state == CHECKMATE:
+            result = "0-1" if game.current_turn == "white" else "1-0"
+        else:
+            result = "1/2-1/2" if status.is_over else "*"
+    tags = {name: "?" for name in SEVEN_TAG_ROSTER}
+    tags.update(headers or {})
+    tags["Result"] = result
+    if start_fen.split()[:4] != STARTING_FEN.split()[:4]:
+        tags["SetUp"] = "1"
+        tags["FEN"] = start_fen
+    tokens.append(result)
+    
+    lines = [f'[{name} "{_escape(value)}"]' for name, value in tags.items()]
+    lines.append("")
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > LINE_LENGTH:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n\n"
+
+def write_game(out, game, headers=None, result=None):
+    """Append a game to an open PGN file"""
+    out.write(game_to_pgn(game, headers, result))
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+def _random_game(rng, max_plies):
+    game = load_fen(STARTING_FEN)
+    for _ in range(max_plies):
+        moves = legal_moves(game)
+        if not moves:
+            break
+        game.make_move(*rng.choice(moves))
+    return game
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PGN parsing and SAN replay on an archive")
+    parser.add_argument("path", help="PGN file to read")
+    parser.add_argument("--generate", type=int, metavar="GAMES",
+                        help="first write this many random games to the file")
+    parser.add_argument("--max-plies", type=int, default=200, help="length cap for generated games")
+    parser.add_argument("--seed", type=int, help="seed for generated games")
+    parser.add_argument("--parse-only", action="store_true", help="skip replaying the moves")
+    args = parser.parse_args(argv)
+    
+    if args.generate:
+        rng = random.Random(args.seed)
+        with open(args.path, "w") as out:
+            for number in range(args.generate):
+                write_game(out, _random_game(rng, args.max_plies), {"Event": "Random game",
+                                                                     "Round": str(number + 1)})
+    
+    games = plies = failures = 0
+    start = time.perf_counter()
+    with open(args.path) as f:
+        for record in read_games(f):
+            games += 1
+            plies += len(record.moves)
+            if args.parse_only:
+                continue
+            try:
+                replay(record)
+            except ValueError as error:
+                failures += 1
+                print(f"Game {games}: {error}", file=sys.stderr)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    action = "Parsed" if args.parse_only else "Replayed"
+    print(f"{action} {games} games ({plies} moves) in {elapsed:.2f}s: "
+          f"{games / elapsed:.1f} games/s, {plies / elapsed:.0f} moves/s, {failures} failed")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,13 @@
-import pygame
-from utils import load_image
-
 class Piece:
     def __init__(self, color, position):
         self.color = color  # "white" or "black"
         self.position = position  # (row, col)
         self.has_moved = False
-        self.image = self._load_image()
     
-    def _load_image(self):
-        """Load the appropriate image for this piece"""
-        filename = f"{self.color}_{self.__class__.__name__.lower()}.png"
-        return load_image(filename)
+    @property
+    def name(self):
+        """Lowercase piece type, e.g. "pawn" (also names its sprite file)"""
+        return self.__class__.__name__.lower()
     
     def get_valid_moves(self, board, check_castling=True, check_en_passant=True):
         """Return a list of valid moves for this piece"""
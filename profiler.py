@@ -0,0 +1,160 @@
+# profiler.py
+import collections
+import json
+import threading
+import time
+
+import pygame
+
+import metrics
+
+FRAME_WINDOW = 240  # Frames kept for averages and the histogram
+
+# Frame-time histogram buckets in milliseconds (60 FPS is 16.7ms)
+HISTOGRAM_BUCKETS_MS = (1, 2, 4, 8, 17, 33)
+
+OVERLAY_BACKGROUND = (0, 0, 0, 190)
+OVERLAY_TEXT_COLOR = (230, 230, 230)
+OVERLAY_BAR_COLOR = (100, 249, 83)
+
+class FrameProfiler:
+    """Per-stage timings of the main loop over a rolling window of frames.
+    
+    Call begin_frame(), then lap(stage) after each stage and end_frame().
+    With a log file, each frame is also written to it as a JSON line.
+    """
+    
+    def __init__(self, log=None):
+        self.log = log
+        self.frames = collections.deque(maxlen=FRAME_WINDOW)  # (total seconds, {stage: seconds})
+        self.background = {}  # Latest timing of work done off the main thread
+        self._frame_start = self._last_lap = time.perf_counter()
+        self._stages = {}
+    
+    def begin_frame(self):
+        self._frame_start = self._last_lap = time.perf_counter()
+        self._stages = {}
+    
+    def lap(self, stage):
+        """Charge the time since the last lap (or the frame start) to a stage"""
+        now = time.perf_counter()
+        self._stages[stage] = self._stages.get(stage, 0.0) + now - self._last_lap
+        self._last_lap = now
+    
+    def record_background(self, name, seconds):
+        self.background[name] = seconds
+    
+    def end_frame(self, counters=None):
+        total = time.perf_counter() - self._frame_start
+        self.frames.append((total, self._stages))
+        if self.log:
+            entry = {"time": time.time(), "frame_ms": round(total * 1000, 3),
+                     "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self._stages.items()},
+                     "background_ms": {name: round(seconds * 1000, 3)
+                                       for name, seconds in self.background.items()}}
+            if counters:
+                entry["counters"] = counters.totals()
+            self.log.write(json.dumps(entry) + "\n")
+            self.log.flush()
+    
+    def stage_averages(self):
+        """Average milliseconds per frame for each stage"""
+        totals = collections.defaultdict(float)
+        for _, stages in self.frames:
+            for name, seconds in stages.items():
+                totals[name] += seconds
+        count = max(len(self.frames), 1)
+        return {name: 1000 * seconds / count for name, seconds in totals.items()}
+    
+    def histogram(self):
+        """Frame counts per HISTOGRAM_BUCKETS_MS bucket, plus one for slower frames"""
+        counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        for total, _ in self.frames:
+            milliseconds = total * 1000
+            bucket = 0
+            while bucket < len(HISTOGRAM_BUCKETS_MS) and milliseconds >= HISTOGRAM_BUCKETS_MS[bucket]:
+                bucket += 1
+            counts[bucket] += 1
+        return counts
+
+class RulesCounters:
+    """Counts board clones, attack scans and legal-move generations.
+    
+    A metrics sink: the rules core is only wrapped between install() and
+    uninstall(), so it costs nothing while profiling is off. Counts include
+    work done on the analysis worker thread.
+    """
+    
+    # Metric name -> counter name
+    HOOKS = {
+        "board_clone": "clones",
+        "board_is_square_attacked": "attack_scans",
+        # Every legal-move generation for a whole side starts here
+        "game_find_checks_and_pins": "move_generations",
+    }
+    
+    def __init__(self):
+        self.counts = dict.fromkeys(self.HOOKS.values(), 0)
+        self.last_move = dict(self.counts)  # Counts during the last move
+        self._move_start = dict(self.counts)
+        self.installed = False
+        # Hooked methods also run on the analysis worker thread
+        self._lock = threading.Lock()
+    
+    def install(self):
+        metrics.install(self, self.HOOKS)
+        self.installed = True
+    
+    def uninstall(self):
+        metrics.uninstall(self)
+        self.installed = False
+    
+    def observe(self, name, seconds):
+        with self._lock:
+            self.counts[self.HOOKS[name]] += 1
+    
+    def mark_move(self):
+        """Close the per-move count at a move boundary"""
+        with self._lock:
+            self.last_move = {name: count - self._move_start[name] for name, count in self.counts.items()}
+            self._move_start = dict(self.counts)
+    
+    def totals(self):
+        with self._lock:
+            return dict(self.counts)
+
+def draw_overlay(profiler, counters, font):
+    """Render the profiling panel: stage timings, frame-time histogram and rules counters"""
+    lines = []
+    averages = profiler.stage_averages()
+    frame_ms = sum(averages.values())
+    lines.append(f"frame {frame_ms:6.2f} ms avg over {len(profiler.frames)} frames")
+    for name, milliseconds in sorted(averages.items()):
+        lines.append(f"  {name:<8} {milliseconds:6.2f} ms")
+    for name, seconds in sorted(profiler.background.items()):
+        lines.append(f"  {name:<8} {seconds * 1000:6.2f} ms (worker, last)")
+    lines.append("rules core      last move      total")
+    for name, total in counters.totals().items():
+        lines.append(f"  {name:<16} {counters.last_move[name]:8d} {total:10d}")
+    
+    line_height = font.get_linesize()
+    histogram = profiler.histogram()
+    labels = [f"<{limit}ms" for limit in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+    width = 330
+    height = line_height * (len(lines) + len(histogram) + 1) + 10
+    panel = pygame.Surface((width, height), pygame.SRCALPHA)
+    panel.fill(OVERLAY_BACKGROUND)
+    
+    y = 5
+    for line in lines:
+        panel.blit(font.render(line, True, OVERLAY_TEXT_COLOR), (5, y))
+        y += line_height
+    panel.blit(font.render("frame times", True, OVERLAY_TEXT_COLOR), (5, y))
+    y += line_height
+    most = max(max(histogram), 1)
+    for label, count in zip(labels, histogram):
+        panel.blit(font.render(f"{label:>7} {count:4d}", True, OVERLAY_TEXT_COLOR), (5, y))
+        bar_width = (width - 110) * count // most
+        pygame.draw.rect(panel, OVERLAY_BAR_COLOR, (100, y + 3, bar_width, line_height - 6))
+        y += line_height
+    return panel
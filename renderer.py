@@ -0,0 +1,156 @@
+# renderer.py
+import pygame
+
+from utils import SpriteAtlas
+
+BOARD_SIZE = 8
+PIECE_SCALE = 0.8  # Sprite size relative to a square
+
+# Colors
+LIGHT_SQUARE_COLOR = (255, 255, 255)
+DARK_SQUARE_COLOR = (120, 120, 120)
+BORDER_COLOR = (0, 0, 0)
+HIGHLIGHT_COLOR = (100, 249, 83, 180)  # Semi-transparent green
+LAST_MOVE_COLOR = (250, 240, 80, 180)  # Semi-transparent yellow
+HINT_COLOR = (80, 160, 250, 180)  # Semi-transparent blue
+
+class BoardRenderer:
+    """Draws the board onto the screen, redrawing only the squares that changed.
+    
+    The empty board and the highlight overlays are built once per square size.
+    Each render() compares what every square should show with the last frame
+    and returns the rectangles it redrew, ready for pygame.display.update().
+    """
+    
+    def __init__(self, screen, square_size, font):
+        self.font = font
+        self.atlas = SpriteAtlas()
+        self._text_cache = {}
+        self.resize(screen, square_size)
+    
+    def resize(self, screen, square_size):
+        """Start drawing at a new square size, e.g. after the window was resized"""
+        self.screen = screen
+        self.square_size = square_size
+        self.piece_size = int(square_size * PIECE_SCALE)
+        self._background = self._draw_background()
+        self._overlays = {}
+        for name, color in (("last_move", LAST_MOVE_COLOR), ("hint", HINT_COLOR),
+                            ("highlight", HIGHLIGHT_COLOR)):
+            overlay = pygame.Surface((square_size, square_size), pygame.SRCALPHA)
+            overlay.fill(color)
+            self._overlays[name] = overlay.convert_alpha()
+        self.invalidate()
+    
+    def invalidate(self):
+        """Redraw everything next frame, e.g. after something else drew over the screen"""
+        self._squares = None
+        self._labels = ()
+        self._label_rects = []
+        self._panel_rect = None
+    
+    def render(self, board, selected_piece, valid_moves, last_move, hint_move=None, labels=(),
+               panel=None):
+        """Bring the screen up to date and return the list of rectangles that changed.
+        
+        labels are (text, color, topleft) drawn on top of the board. panel is
+        an optional (surface, topleft) drawn over everything and repainted
+        every frame, such as the profiling overlay.
+        """
+        labels = tuple(labels)
+        squares = self._square_states(board, selected_piece, valid_moves, last_move, hint_move)
+        full_redraw = self._squares is None
+        if full_redraw:
+            # Clear any window area the board doesn't cover
+            self.screen.fill(BORDER_COLOR)
+            dirty = set(squares)
+        else:
+            dirty = {pos for pos, state in squares.items() if state != self._squares[pos]}
+        
+        # Labels sit on top of squares: a changed label repaints the squares under
+        # its old and new place, and a repainted square repaints its labels in full
+        label_rects = [self._text(text, color).get_rect(topleft=topleft) for text, color, topleft in labels]
+        if labels != self._labels:
+            for rect in self._label_rects + label_rects:
+                dirty |= self._squares_under(rect)
+        panel_rect = panel[0].get_rect(topleft=panel[1]) if panel else None
+        for rect in (self._panel_rect, panel_rect):
+            if rect:
+                dirty |= self._squares_under(rect)
+        changed = True
+        while changed:
+            changed = False
+            for rect in label_rects:
+                under = self._squares_under(rect)
+                if dirty & under and not under <= dirty:
+                    dirty |= under
+                    changed = True
+        
+        size = self.square_size
+        rects = []
+        for row, col in dirty:
+            rect = pygame.Rect(col * size, row * size, size, size)
+            self.screen.blit(self._background, rect, rect)
+            piece_key, overlays = squares[(row, col)]
+            for name in overlays:
+                self.screen.blit(self._overlays[name], rect)
+            if piece_key:
+                self.atlas.blit(self.screen, *piece_key, self.piece_size, rect.center)
+            rects.append(rect)
+        
+        for (text, color, topleft), rect in zip(labels, label_rects):
+            if dirty & self._squares_under(rect):
+                self.screen.blit(self._text(text, color), topleft)
+        if panel:
+            # Keep the panel on the board, where repainting squares erases it
+            self.screen.set_clip(pygame.Rect(0, 0, BOARD_SIZE * size, BOARD_SIZE * size))
+            self.screen.blit(*panel)
+            self.screen.set_clip(None)
+        
+        self._squares = squares
+        self._panel_rect = panel_rect
+        self._labels = labels
+        self._label_rects = label_rects
+        return [self.screen.get_rect()] if full_redraw else rects
+    
+    def _draw_background(self):
+        size = self.square_size
+        background = pygame.Surface((BOARD_SIZE * size, BOARD_SIZE * size)).convert()
+        for row in range(BOARD_SIZE):
+            for col in range(BOARD_SIZE):
+                color = LIGHT_SQUARE_COLOR if (row + col) % 2 == 0 else DARK_SQUARE_COLOR
+                pygame.draw.rect(background, color, (col * size, row * size, size, size))
+        return background
+    
+    def _square_states(self, board, selected_piece, valid_moves, last_move, hint_move):
+        """(piece, overlay names) for every square, in drawing order"""
+        squares = {}
+        for row in range(BOARD_SIZE):
+            for col in range(BOARD_SIZE):
+                pos = (row, col)
+                overlays = []
+                if last_move and (pos == last_move[0] or pos == last_move[1]):
+                    overlays.append("last_move")
+                if hint_move and pos in hint_move:
+                    overlays.append("hint")
+                if pos == selected_piece:
+                    overlays.append("highlight")
+                if pos in valid_moves:
+                    overlays.append("highlight")
+                piece = board.board[row][col]
+                squares[pos] = ((piece.color, piece.name) if piece else None, tuple(overlays))
+        return squares
+    
+    def _squares_under(self, rect):
+        size = self.square_size
+        return {(row, col)
+                for row in range(max(rect.top // size, 0), min((rect.bottom - 1) // size + 1, BOARD_SIZE))
+                for col in range(max(rect.left // size, 0), min((rect.right - 1) // size + 1, BOARD_SIZE))}
+    
+    def _text(self, text, color):
+        key = (text, color)
+        surface = self._text_cache.get(key)
+        if surface is None:
+            surface = self.font.render(text, True, color)
+            self._text_cache[key] = surface
+        return surface
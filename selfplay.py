@@ -0,0 +1,224 @@
+# selfplay.py
+"""Headless batch self-play across worker processes.
+
+Each finished game is written to a JSON-lines file as soon as it ends:
+
+    {"game": 0, "white": "random", "black": "engine", "moves": ["e2e4", ...],
+     "result": "0-1", "termination": "checkmate", "plies": 57}
+    
+    python selfplay.py --games 1000 --out games.jsonl
+    python selfplay.py --games 50 --white engine --black random --engine-time 50
+    python selfplay.py --games 20 --script openings.txt --white engine --black engine
+
+Only the game logic is imported, never pygame or the assets.
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import sys
+import time
+
+from board import Board
+from book import OpeningBook
+from engine import Engine
+from fen import STARTING_FEN, load_fen, parse_square
+from game import CHECKMATE
+from perft import legal_moves, move_name
+from pieces.rook import Rook
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.queen import Queen
+from tt import TranspositionTable
+
+DEFAULT_MAX_PLIES = 300
+ENGINE_TABLE_MB = 16
+
+PROMOTION_LETTERS = {"q": Queen, "r": Rook, "b": Bishop, "n": Knight}
+
+class RandomPolicy:
+    """Uniformly random legal move, underpromotions included"""
+    
+    name = "random"
+    
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+    
+    def choose(self, game, ply):
+        return self.random.choice(legal_moves(game))
+
+class EnginePolicy:
+    """The engine's best move within a time or node budget per move, after any book moves"""
+    
+    name = "engine"
+    
+    def __init__(self, time_ms=100, max_nodes=None, tt=None, book=None, seed=None):
+        self.time_ms = time_ms
+        self.max_nodes = max_nodes
+        self.tt = tt
+        self.book = book
+        self.random = random.Random(seed)
+    
+    def choose(self, game, ply):
+        if self.book:
+            move = self.book.choose(game, self.random)
+            if move:
+                return move
+        if self.tt:
+            self.tt.new_search()
+        from_pos, to_pos = Engine(self.max_nodes, tt=self.tt).search(game, self.time_ms).move
+        return from_pos, to_pos, None
+
+class ScriptedPolicy:
+    """Plays a fixed line of moves (e.g. an opening) and then defers to another policy"""
+    
+    def __init__(self, moves, fallback):
+        self.moves = [parse_move(move) for move in moves]
+        self.fallback = fallback
+        self.name = fallback.name
+    
+    def choose(self, game, ply):
+        if ply < len(self.moves):
+            return self.moves[ply]
+        return self.fallback.choose(game, ply)
+
+def parse_move(name):
+    """Parse coordinate notation such as "e2e4" or "e7e8q" into (from_pos, to_pos, promotion)"""
+    if len(name) not in (4, 5) or (len(name) == 5 and name[4] not in PROMOTION_LETTERS):
+        raise ValueError(f"Invalid move: {name!r}")
+    promotion = PROMOTION_LETTERS[name[4]] if len(name) == 5 else None
+    return parse_square(name[:2]), parse_square(name[2:4]), promotion
+
+def check_script(fen, moves):
+    """Raise ValueError unless every move of a script line is legal, played from fen"""
+    game = load_fen(fen, Board)
+    for ply, name in enumerate(moves):
+        if not game.make_move(*parse_move(name)):
+            raise ValueError(f"Illegal move {name!r} at ply {ply}")
+
+def play_game(game, white, black, max_plies=DEFAULT_MAX_PLIES):
+    """Play one game to the end; returns (move names, result, termination)"""
+    moves = []
+    for ply in range(max_plies + 1):
+        status = game.status()
+        if status.state == CHECKMATE:
+            return moves, "0-1" if game.current_turn == "white" else "1-0", "checkmate"
+        if status.is_over:
+            return moves, "1/2-1/2", status.state
+        if ply == max_plies:
+            break
+        
+        policy = white if game.current_turn == "white" else black
+        move = policy.choose(game, ply)
+        if not game.make_move(*move):
+            raise ValueError(f"Illegal move {move_name(move)} at ply {ply}")
+        moves.append(move_name(move))
+    return moves, "1/2-1/2", "move limit"
+
+# Per-process engine table and opening book, created on first use
+_engine_table = None
+_book = None
+
+def _make_policy(kind, seed, options):
+    global _engine_table, _book
+    if kind == "random":
+        return RandomPolicy(seed)
+    if _engine_table is None:
+        _engine_table = TranspositionTable(ENGINE_TABLE_MB)
+    if _book is None and options.get("book"):
+        _book = OpeningBook(options["book"])
+    return EnginePolicy(options["engine_time"], options["engine_nodes"], _engine_table, _book, seed)
+
+def _play(index, options, script):
+    """Worker entry point: play game number index and return its record"""
+    seed = None if options["seed"] is None else (options["seed"] * 1000003 + index) * 2
+    white = _make_policy(options["white"], seed, options)
+    black = _make_policy(options["black"], None if seed is None else seed + 1, options)
+    if script:
+        white = ScriptedPolicy(script, white)
+        black = ScriptedPolicy(script, black)
+    
+    game = load_fen(options["fen"], Board)
+    moves, result, termination = play_game(game, white, black, options["max_plies"])
+    return {"game": index, "white": white.name, "black": black.name, "moves": moves,
+            "result": result, "termination": termination, "plies": len(moves)}
+
+def run(games, out, workers=None, scripts=(), progress=None, **options):
+    """Play games across a process pool, writing each record to out as it finishes.
+    
+    scripts are move lists that games cycle through. progress, if given, is
+    called with (games finished, plies played, elapsed seconds) after each game.
+    Returns the same totals for the whole run.
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    finished = plies = 0
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        # Keep a few games per worker in flight rather than queueing them all
+        pending = set()
+        next_game = 0
+        while next_game < games or pending:
+            while next_game < games and len(pending) < 4 * workers:
+                script = scripts[next_game % len(scripts)] if scripts else None
+                pending.add(pool.submit(_play, next_game, options, script))
+                next_game += 1
+            done, pending = concurrent.futures.wait(pending,
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                finished += 1
+                plies += record["plies"]
+                if progress:
+                    progress(finished, plies, time.perf_counter() - start)
+    return finished, plies, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many games in parallel without a display")
+    parser.add_argument("--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--white", choices=("random", "engine"), default="random")
+    parser.add_argument("--black", choices=("random", "engine"), default="random")
+    parser.add_argument("--engine-time", type=int, default=100, help="engine milliseconds per move")
+    parser.add_argument("--engine-nodes", type=int, help="engine node budget per move")
+    parser.add_argument("--book", help="opening book for the engine to play from first")
+    parser.add_argument("--script", help="file of opening lines, one game's moves per line, "
+                                         "e.g. \"e2e4 e7e5 g1f3\"")
+    parser.add_argument("--fen", default=STARTING_FEN, help="starting position (default: start)")
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES,
+                        help="adjudicate a draw after this many plies")
+    parser.add_argument("--seed", type=int, help="seed for reproducible random play")
+    parser.add_argument("--out", default="selfplay.jsonl", help="JSON-lines output file")
+    parser.add_argument("--report-every", type=int, default=100, help="progress line every N games")
+    args = parser.parse_args(argv)
+    
+    scripts = []
+    if args.script:
+        with open(args.script) as f:
+            scripts = [line.split() for line in f if line.strip()]
+        # A bad line would only fail inside a worker, taking the whole run with it
+        for number, line in enumerate(scripts, 1):
+            try:
+                check_script(args.fen, line)
+            except ValueError as error:
+                parser.error(f"{args.script}, line {number}: {error}")
+    
+    def report(finished, plies, elapsed):
+        if finished % args.report_every == 0 or finished == args.games:
+            print(f"{finished:6d} games  {finished / elapsed:8.2f} games/s  "
+                  f"{plies / elapsed:9.1f} positions/s", flush=True)
+    
+    with open(args.out, "w") as out:
+        finished, plies, elapsed = run(args.games, out, args.workers, scripts, report,
+                                       white=args.white, black=args.black,
+                                       engine_time=args.engine_time, engine_nodes=args.engine_nodes,
+                                       book=args.book,
+                                       fen=args.fen, max_plies=args.max_plies, seed=args.seed)
+    print(f"Played {finished} games ({plies} positions) in {elapsed:.2f}s: "
+          f"{finished / elapsed:.2f} games/s, {plies / elapsed:.1f} positions/s -> {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
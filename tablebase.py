@@ -0,0 +1,621 @@
+# tablebase.py
+"""Endgame tablebases: perfect play for positions with a few pieces.
+
+generate() solves an ending such as "KQK" or "KBNK" (white's pieces, then
+black's) by retrograde analysis: it starts from every checkmate and works
+backwards one ply at a time, so each position learns whether the side to
+move wins, loses or draws, and in how many plies the game ends in mate.
+Captures and promotions lead into smaller endings, which are solved first.
+
+Positions are indexed by side to move, the white king's square and the
+square of every other piece. Board symmetries shrink the tables: without
+pawns, the white king is always moved into the a1-d1-d4 triangle by
+reflections (8 symmetries), and with pawns it is kept on files a-d by a
+left-right mirror. Castling and en passant are not part of the positions.
+
+Each table file is a short header and then one byte per position:
+
+    0         draw (or a position that cannot occur)
+    1..127    the side to move wins; mate in 2 * value - 1 plies
+    128..255  the side to move loses; mated in 2 * (value - 128) plies
+
+Tablebases(directory) memory-maps the files on first use, and probe()
+answers for a Board in constant time.
+
+    python tablebase.py generate KQK KRK KPK KBNK --dir tables
+    python tablebase.py probe --dir tables --fen "8/8/8/8/8/2k5/8/2KQ4 w - - 0 1"
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+from pieces.pawn import Pawn
+from pieces.rook import Rook
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.queen import Queen
+from pieces.king import King
+
+# Results for the side to move
+WIN = "win"
+LOSS = "loss"
+DRAW = "draw"
+
+HEADER = struct.Struct("<4sB8sxxx")  # magic, format version, ending name
+MAGIC = b"CHTB"
+VERSION = 1
+SUFFIX = ".tb"
+MAX_PIECES = 4
+MAX_PLIES = 254
+
+PIECE_LETTERS = {King: "K", Queen: "Q", Rook: "R", Bishop: "B", Knight: "N", Pawn: "P"}
+PROMOTION_LETTERS = "QRBN"
+PIECE_ORDER = "QRBNP"  # Strongest first, for naming endings
+
+# Endings that are drawn whatever the position, so need no table
+DEAD_DRAWS = {"KK", "KBK", "KNK"}
+
+WHITE, BLACK = 0, 1
+
+# Move tables by square (square = row * 8 + col, row 0 is rank 8)
+def _steps(offsets):
+    return [tuple(row * 8 + col + dr * 8 + dc for dr, dc in offsets
+                  if 0 <= row + dr < 8 and 0 <= col + dc < 8)
+            for row in range(8) for col in range(8)]
+
+def _rays(directions):
+    rays = []
+    for row in range(8):
+        for col in range(8):
+            square_rays = []
+            for dr, dc in directions:
+                ray = []
+                r, c = row + dr, col + dc
+                while 0 <= r < 8 and 0 <= c < 8:
+                    ray.append(r * 8 + c)
+                    r, c = r + dr, c + dc
+                if ray:
+                    square_rays.append(tuple(ray))
+            rays.append(tuple(square_rays))
+    return rays
+
+ROOK_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+BISHOP_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+KING_STEPS = _steps(ROOK_DIRECTIONS + BISHOP_DIRECTIONS)
+KNIGHT_STEPS = _steps([(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)])
+SLIDER_RAYS = {"R": _rays(ROOK_DIRECTIONS), "B": _rays(BISHOP_DIRECTIONS),
+               "Q": _rays(ROOK_DIRECTIONS + BISHOP_DIRECTIONS)}
+# White pawns move towards row 0
+PAWN_CAPTURES = [_steps([(-1, -1), (-1, 1)]), _steps([(1, -1), (1, 1)])]
+
+# Squares strictly between two squares on a line, as a bit mask, and which
+# sliders can travel that line
+_BETWEEN = [0] * 4096
+_LINE_PIECES = [""] * 4096
+for _letter, _directions in (("RQ", ROOK_DIRECTIONS), ("BQ", BISHOP_DIRECTIONS)):
+    for _from in range(64):
+        for _dr, _dc in _directions:
+            _mask = 0
+            _r, _c = _from // 8 + _dr, _from % 8 + _dc
+            while 0 <= _r < 8 and 0 <= _c < 8:
+                _BETWEEN[_from * 64 + _r * 8 + _c] = _mask
+                _LINE_PIECES[_from * 64 + _r * 8 + _c] = _letter
+                _mask |= 1 << (_r * 8 + _c)
+                _r, _c = _r + _dr, _c + _dc
+_KING_SETS = [frozenset(steps) for steps in KING_STEPS]
+_KNIGHT_SETS = [frozenset(steps) for steps in KNIGHT_STEPS]
+_PAWN_CAPTURE_SETS = [[frozenset(steps) for steps in PAWN_CAPTURES[color]] for color in (WHITE, BLACK)]
+
+def _transform(function):
+    return tuple(function(square // 8, square % 8) for square in range(64))
+
+# Board symmetries as square maps; reflecting in the a1-h8 diagonal swaps
+# file and rank
+_MIRROR = _transform(lambda row, col: row * 8 + 7 - col)
+_FLIP = _transform(lambda row, col: (7 - row) * 8 + col)
+_DIAGONAL = _transform(lambda row, col: (7 - col) * 8 + 7 - row)
+_IDENTITY = tuple(range(64))
+
+def _compose(first, second):
+    return tuple(second[first[square]] for square in range(64))
+
+PAWN_SYMMETRIES = (_IDENTITY, _MIRROR)
+ALL_SYMMETRIES = tuple({_compose(_compose(a, b), c): None
+                        for a in (_IDENTITY, _MIRROR) for b in (_IDENTITY, _FLIP)
+                        for c in (_IDENTITY, _DIAGONAL)})
+# Where the white king is kept: files a-d with pawns, else the a1-d1-d4 triangle
+PAWN_KING_SQUARES = tuple(square for square in range(64) if square % 8 < 4)
+KING_SQUARES = tuple(square for square in range(64)
+                     if square % 8 < 4 and 7 - square // 8 <= square % 8)
+
+def ending_name(name):
+    """Canonical name of an ending, e.g. "kkq" -> "KQK": the stronger side is white"""
+    name = name.upper()
+    split = name.find("K", 1)
+    letters = name.replace("K", "")
+    if not name.startswith("K") or split < 0 or name.count("K") != 2 \
+            or any(letter not in PIECE_ORDER for letter in letters):
+        raise ValueError(f"Invalid ending name: {name!r}")
+    pieces = [(WHITE, letter, 0) for letter in name[1:split]] + [(BLACK, letter, 0) for letter in name[split + 1:]]
+    return _normalize(pieces, WHITE)[0]
+
+def _strength(letters):
+    return len(letters), [len(PIECE_ORDER) - PIECE_ORDER.index(letter) for letter in letters]
+
+def _normalize(pieces, turn):
+    """Name the ending of [(color, letter, square)] with the stronger side as white.
+    
+    Returns (name, pieces, turn), with colors swapped and the board flipped
+    top to bottom when black was the stronger side.
+    """
+    white = sorted((letter for color, letter, _ in pieces if color == WHITE and letter != "K"),
+                   key=PIECE_ORDER.index)
+    black = sorted((letter for color, letter, _ in pieces if color == BLACK and letter != "K"),
+                   key=PIECE_ORDER.index)
+    if _strength(black) > _strength(white):
+        pieces = [(1 - color, letter, square ^ 56) for color, letter, square in pieces]
+        white, black, turn = black, white, 1 - turn
+    return "K" + "".join(white) + "K" + "".join(black), pieces, turn
+
+class Layout:
+    """Position indexing for one ending.
+    
+    Pieces are ordered white king, black king, then the other white and
+    black pieces in ending_name order.
+    """
+    
+    def __init__(self, name):
+        if ending_name(name) != name:
+            raise ValueError(f"Not a canonical ending name: {name!r}")
+        split = name.index("K", 1)
+        self.name = name
+        self.pieces = ([(WHITE, "K"), (BLACK, "K")] + [(WHITE, letter) for letter in name[1:split]]
+                       + [(BLACK, letter) for letter in name[split + 1:]])
+        if len(self.pieces) > MAX_PIECES:
+            raise ValueError(f"Endings have at most {MAX_PIECES} pieces: {name!r}")
+        self.colors = [color for color, _ in self.pieces]
+        self.letters = [letter for _, letter in self.pieces]
+        pawns = "P" in name
+        king_squares = PAWN_KING_SQUARES if pawns else KING_SQUARES
+        symmetries = PAWN_SYMMETRIES if pawns else ALL_SYMMETRIES
+        self.king_slots = {square: slot for slot, square in enumerate(king_squares)}
+        self.king_squares = king_squares
+        # The symmetries that bring the white king on each square into place
+        self.symmetries = [[symmetry for symmetry in symmetries if symmetry[square] in self.king_slots]
+                           for square in range(64)]
+        self.per_side = len(king_squares) * 64 ** (len(self.pieces) - 1)
+        self.size = 2 * self.per_side
+    
+    def index(self, turn, squares):
+        """Table index of a position given as piece squares in layout order.
+        
+        Of the symmetric copies of a position, the one with the lowest index
+        is the one stored.
+        """
+        best = None
+        for symmetry in self.symmetries[squares[0]]:
+            index = self.king_slots[symmetry[squares[0]]]
+            for square in squares[1:]:
+                index = index * 64 + symmetry[square]
+            if best is None or index < best:
+                best = index
+        return turn * self.per_side + best
+    
+    def decode(self, index):
+        """(turn, squares) for a table index"""
+        turn, index = divmod(index, self.per_side)
+        squares = []
+        for _ in range(len(self.pieces) - 1):
+            index, square = divmod(index, 64)
+            squares.append(square)
+        squares.append(self.king_squares[index])
+        squares.reverse()
+        return turn, squares
+    
+    def arrange(self, pieces):
+        """Piece squares in layout order from [(color, letter, square)] of this ending"""
+        remaining = list(pieces)
+        squares = []
+        for color, letter in self.pieces:
+            for position, (piece_color, piece_letter, square) in enumerate(remaining):
+                if piece_color == color and piece_letter == letter:
+                    squares.append(square)
+                    del remaining[position]
+                    break
+        return squares
+
+def _attacked(target, by_color, squares, colors, letters, occupied, skip=-1):
+    """Whether any piece of by_color (other than piece number skip) attacks target"""
+    for piece, square in enumerate(squares):
+        if colors[piece] != by_color or piece == skip:
+            continue
+        letter = letters[piece]
+        if letter == "K":
+            if target in _KING_SETS[square]:
+                return True
+        elif letter == "N":
+            if target in _KNIGHT_SETS[square]:
+                return True
+        elif letter == "P":
+            if target in _PAWN_CAPTURE_SETS[by_color][square]:
+                return True
+        elif letter in _LINE_PIECES[square * 64 + target] and not _BETWEEN[square * 64 + target] & occupied:
+            return True
+    return False
+
+def _targets(letter, color, square, occupied):
+    """Squares a piece can move to, ignoring what stands on them (pawns: pushes only)"""
+    if letter == "K":
+        return KING_STEPS[square]
+    if letter == "N":
+        return KNIGHT_STEPS[square]
+    if letter == "P":
+        step = -8 if color == WHITE else 8
+        ahead = square + step
+        if occupied >> ahead & 1:
+            return ()
+        start_row = 6 if color == WHITE else 1
+        if square // 8 == start_row and not occupied >> (ahead + step) & 1:
+            return ahead, ahead + step
+        return (ahead,)
+    targets = []
+    for ray in SLIDER_RAYS[letter][square]:
+        for to_square in ray:
+            targets.append(to_square)
+            if occupied >> to_square & 1:
+                break
+    return targets
+
+def _origins(letter, color, square, occupied):
+    """Empty squares a piece on square could have just come from (no captures)"""
+    if letter == "K":
+        return [origin for origin in KING_STEPS[square] if not occupied >> origin & 1]
+    if letter == "N":
+        return [origin for origin in KNIGHT_STEPS[square] if not occupied >> origin & 1]
+    if letter == "P":
+        step = 8 if color == WHITE else -8
+        behind = square + step
+        start_row = 6 if color == WHITE else 1
+        if not 0 < behind // 8 < 7 or occupied >> behind & 1:
+            return []
+        if behind // 8 + (step // 8) == start_row and not occupied >> (behind + step) & 1:
+            return [behind, behind + step]
+        return [behind]
+    origins = []
+    for ray in SLIDER_RAYS[letter][square]:
+        for origin in ray:
+            if occupied >> origin & 1:
+                break
+            origins.append(origin)
+    return origins
+
+def _encode(result, plies):
+    if result == WIN:
+        return (plies + 1) // 2
+    if result == LOSS:
+        return 128 + plies // 2
+    return 0
+
+def _decode(value):
+    if value == 0:
+        return DRAW, 0
+    if value < 128:
+        return WIN, 2 * value - 1
+    return LOSS, 2 * (value - 128)
+
+# Generation states
+_UNKNOWN, _WON, _LOST, _DRAWN, _INVALID = range(5)
+
+class _Generator:
+    """Retrograde solver for one ending; tables holds the solved smaller endings"""
+    
+    def __init__(self, layout, tables):
+        self.layout = layout
+        self.tables = tables
+    
+    def solve(self, progress=None):
+        layout = self.layout
+        size = layout.size
+        state = bytearray(size)
+        # Moves not yet known to lose, plus one for each move out of the ending that doesn't
+        remaining = bytearray(size)
+        exit_loss = bytearray(size)  # Longest loss among moves out of the ending
+        buckets = [[] for _ in range(MAX_PLIES + 2)]  # Per ply, (result, index) to settle
+        
+        for index in range(size):
+            if progress and index % 200000 == 0:
+                progress(f"{layout.name}: scanning {index}/{size}")
+            turn, squares = layout.decode(index)
+            if not self._valid(index, turn, squares):
+                state[index] = _INVALID
+                continue
+            successors, exits, in_check = self._successors(turn, squares)
+            if not successors and not exits:
+                if in_check:
+                    buckets[0].append((_LOST, index))
+                else:
+                    state[index] = _DRAWN
+                continue
+            count = len(successors)
+            longest_loss = 0
+            for result, plies in exits:
+                if result == LOSS:
+                    # The mover wins through this capture or promotion
+                    buckets[plies + 1].append((_WON, index))
+                    count += 1
+                elif result == WIN:
+                    longest_loss = max(longest_loss, plies + 1)
+                else:
+                    count += 1
+            if count > 255:
+                raise ValueError(f"Too many moves in {layout.name} position {index}")
+            remaining[index] = count
+            exit_loss[index] = longest_loss
+            if count == 0:
+                buckets[longest_loss].append((_LOST, index))
+        
+        plies_per_state = bytearray(size)
+        for plies in range(MAX_PLIES + 1):
+            bucket = buckets[plies]
+            if progress and bucket:
+                progress(f"{layout.name}: {len(bucket)} positions at {plies} plies")
+            while bucket:
+                result, index = bucket.pop()
+                if state[index] != _UNKNOWN:
+                    continue
+                state[index] = result
+                plies_per_state[index] = plies
+                for predecessor in self._predecessors(index):
+                    if state[predecessor] != _UNKNOWN:
+                        continue
+                    if result == _LOST:
+                        buckets[plies + 1].append((_WON, predecessor))
+                    else:
+                        remaining[predecessor] -= 1
+                        if remaining[predecessor] == 0:
+                            loss_plies = max(plies + 1, exit_loss[predecessor])
+                            if loss_plies > MAX_PLIES:
+                                raise ValueError(f"{layout.name} has mates longer than {MAX_PLIES} plies")
+                            buckets[loss_plies].append((_LOST, predecessor))
+        if buckets[MAX_PLIES + 1]:
+            raise ValueError(f"{layout.name} has mates longer than {MAX_PLIES} plies")
+        
+        values = bytearray(size)
+        for index in range(size):
+            if state[index] == _WON:
+                values[index] = _encode(WIN, plies_per_state[index])
+            elif state[index] == _LOST:
+                values[index] = _encode(LOSS, plies_per_state[index])
+        return values
+    
+    def _valid(self, index, turn, squares):
+        layout = self.layout
+        if len(set(squares)) != len(squares):
+            return False
+        for square, letter in zip(squares, layout.letters):
+            if letter == "P" and square // 8 in (0, 7):
+                return False
+        occupied = 0
+        for square in squares:
+            occupied |= 1 << square
+        # The side that just moved cannot have left its king in check
+        if _attacked(squares[1 - turn], turn, squares, layout.colors, layout.letters, occupied):
+            return False
+        return layout.index(turn, squares) == index
+    
+    def _successors(self, turn, squares):
+        """(in-ending successor indices, [(result, plies)] of moves leaving the ending, in check)"""
+        layout = self.layout
+        colors, letters = layout.colors, layout.letters
+        occupied = 0
+        for square in squares:
+            occupied |= 1 << square
+        king = squares[turn]
+        in_check = _attacked(king, 1 - turn, squares, colors, letters, occupied)
+        successors = set()
+        exits = []
+        for piece, square in enumerate(squares):
+            if colors[piece] != turn:
+                continue
+            letter = letters[piece]
+            targets = list(_targets(letter, turn, square, occupied))
+            if letter == "P":
+                targets += [to_square for to_square in PAWN_CAPTURES[turn][square]
+                            if occupied >> to_square & 1]
+            for to_square in targets:
+                captured = -1
+                if occupied >> to_square & 1:
+                    captured = squares.index(to_square)
+                    if colors[captured] == turn:
+                        continue
+                after = occupied & ~(1 << square) | 1 << to_square
+                moved = list(squares)
+                moved[piece] = to_square
+                if _attacked(to_square if piece == turn else king, 1 - turn, moved, colors, letters,
+                             after, captured):
+                    continue
+                promotion = letter == "P" and to_square // 8 in (0, 7)
+                if captured < 0 and not promotion:
+                    successors.add(layout.index(1 - turn, moved))
+                    continue
+                # Captures and promotions continue in a smaller or different ending
+                kept = [other for other in range(len(squares)) if other != captured]
+                for new_letter in PROMOTION_LETTERS if promotion else (letter,):
+                    pieces = [(colors[other], new_letter if other == piece else letters[other], moved[other])
+                              for other in kept]
+                    exits.append(self._lookup(pieces, 1 - turn))
+        return successors, exits, in_check
+    
+    def _predecessors(self, index):
+        """Indices of the positions with a quiet move into this one"""
+        layout = self.layout
+        colors, letters = layout.colors, layout.letters
+        turn, squares = layout.decode(index)
+        mover = 1 - turn
+        occupied = 0
+        for square in squares:
+            occupied |= 1 << square
+        found = set()
+        for piece, square in enumerate(squares):
+            if colors[piece] != mover:
+                continue
+            for origin in _origins(letters[piece], mover, square, occupied):
+                before = list(squares)
+                before[piece] = origin
+                # The side to move here cannot have been in check before the move
+                if _attacked(squares[turn], mover, before, colors, letters,
+                             occupied & ~(1 << square) | 1 << origin):
+                    continue
+                found.add(layout.index(mover, before))
+        return found
+    
+    def _lookup(self, pieces, turn):
+        """(result, plies) for the side to move in a position of a smaller ending"""
+        name, pieces, turn = _normalize(pieces, turn)
+        if name in DEAD_DRAWS:
+            return DRAW, 0
+        layout, values = self.tables[name]
+        return _decode(values[layout.index(turn, layout.arrange(pieces))])
+
+def _dependencies(name):
+    """Endings reachable from name by one capture or promotion, normalized"""
+    layout = Layout(name)
+    found = set()
+    for removed in range(2, len(layout.pieces)):
+        pieces = [(color, letter, 0) for position, (color, letter) in enumerate(layout.pieces)
+                  if position != removed]
+        found.add(_normalize(pieces, WHITE)[0])
+    for position, (color, letter) in enumerate(layout.pieces):
+        if letter == "P":
+            for new_letter in PROMOTION_LETTERS:
+                pieces = [(piece_color, new_letter if other == position else piece_letter, 0)
+                          for other, (piece_color, piece_letter) in enumerate(layout.pieces)]
+                found.add(_normalize(pieces, WHITE)[0])
+    return found - DEAD_DRAWS - {name}
+
+def generate(names, directory, progress=None):
+    """Solve endings and everything they lead to, writing a table file for each.
+    
+    Tables already in directory are reused. Returns the names solved.
+    """
+    os.makedirs(directory, exist_ok=True)
+    tables = {}
+    solved = []
+    
+    def solve(name):
+        if name in tables or name in DEAD_DRAWS:
+            return
+        layout = Layout(name)
+        path = os.path.join(directory, name + SUFFIX)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            tables[name] = (layout, memoryview(data)[HEADER.size:])
+            return
+        for dependency in sorted(_dependencies(name)):
+            solve(dependency)
+        start = time.perf_counter()
+        values = _Generator(layout, tables).solve(progress)
+        with open(path, "wb") as out:
+            out.write(HEADER.pack(MAGIC, VERSION, name.encode()))
+            out.write(values)
+        tables[name] = (layout, values)
+        solved.append(name)
+        if progress:
+            progress(f"{name}: {layout.size} positions in {time.perf_counter() - start:.1f}s -> {path}")
+    
+    for name in names:
+        solve(name)
+    return solved
+
+class Tablebases:
+    """The table files in a directory, memory-mapped as positions need them"""
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self._tables = {}  # Ending name -> (Layout, mmap), or None when there is no file
+        self._files = []
+    
+    def probe(self, board, turn):
+        """(WIN, LOSS or DRAW, plies to mate) for the side to move, or None if not covered.
+        
+        Positions with castling rights are not covered. En passant is ignored.
+        """
+        white, black = board.pieces["white"], board.pieces["black"]
+        if len(white) + len(black) > MAX_PIECES or board.castling_rights():
+            return None
+        pieces = [(WHITE, PIECE_LETTERS[piece.__class__], row * 8 + col) for (row, col), piece in white.items()]
+        pieces += [(BLACK, PIECE_LETTERS[piece.__class__], row * 8 + col) for (row, col), piece in black.items()]
+        name, pieces, side = _normalize(pieces, WHITE if turn == "white" else BLACK)
+        if name in DEAD_DRAWS:
+            return DRAW, 0
+        table = self._table(name)
+        if table is None:
+            return None
+        layout, data = table
+        return _decode(data[HEADER.size + layout.index(side, layout.arrange(pieces))])
+    
+    def close(self):
+        for memory, f in self._files:
+            memory.close()
+            f.close()
+        self._files = []
+        self._tables = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _table(self, name):
+        if name not in self._tables:
+            path = os.path.join(self.directory, name + SUFFIX)
+            table = None
+            if os.path.exists(path):
+                f = open(path, "rb")
+                memory = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, version, stored_name = HEADER.unpack_from(memory)
+                layout = Layout(name)
+                if (magic, version, stored_name.rstrip(b"\0")) != (MAGIC, VERSION, name.encode()) \
+                        or len(memory) != HEADER.size + layout.size:
+                    memory.close()
+                    f.close()
+                    raise ValueError(f"Not a {name} table: {path!r}")
+                self._files.append((memory, f))
+                table = (layout, memory)
+            self._tables[name] = table
+        return self._tables[name]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate or probe endgame tablebases")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("generate", help="solve endings, e.g. KQK KRK KPK KBNK")
+    build.add_argument("endings", nargs="+")
+    build.add_argument("--dir", default="tables", help="table directory (default: tables)")
+    probe = commands.add_parser("probe", help="look up a position")
+    probe.add_argument("--dir", default="tables", help="table directory (default: tables)")
+    probe.add_argument("--fen", required=True, help="position to look up")
+    args = parser.parse_args(argv)
+    
+    if args.command == "generate":
+        generate([ending_name(name) for name in args.endings], args.dir,
+                 lambda message: print(message, flush=True))
+        return 0
+    
+    from fen import load_fen
+    game = load_fen(args.fen)
+    with Tablebases(args.dir) as tablebases:
+        found = tablebases.probe(game.board, game.current_turn)
+    if found is None:
+        print("Not in the tables")
+        return 1
+    result, plies = found
+    print(result if result == DRAW else f"{result} in {plies} plies")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# tt.py
+import struct
+
+DEFAULT_SIZE_MB = 32
+
+# Bound types, as stored by the engine
+EXACT = 0
+LOWER_BOUND = 1  # Score is at least this (the search failed high)
+UPPER_BOUND = 2  # Score is at most this (the search failed low)
+
+# An entry is (key ^ data, data) with data packing depth, bound, generation,
+# move and score. If another process tears a write, the halves disagree and
+# the entry reads back as a miss
+ENTRY = struct.Struct("<QQ")
+
+# Each bucket has a depth-preferred entry followed by an always-replace entry
+BUCKET_SIZE = 2 * ENTRY.size
+
+GENERATIONS = 64
+
+class TranspositionTable:
+    """Fixed-size table of search results keyed by Zobrist key.
+    
+    All memory is allocated up front, in a bytearray or a given buffer (e.g.
+    shared memory), so the footprint never grows however long a search runs.
+    """
+    
+    def __init__(self, size_mb=DEFAULT_SIZE_MB, buffer=None):
+        if buffer is None:
+            buffer = bytearray(max(BUCKET_SIZE, size_mb * 1024 * 1024 // BUCKET_SIZE * BUCKET_SIZE))
+        self._buffer = buffer
+        self.buckets = len(buffer) // BUCKET_SIZE
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def probe(self, key):
+        """Return (depth, bound, score, move) stored for a key, or None"""
+        offset = (key % self.buckets) * BUCKET_SIZE
+        for slot in (offset, offset + ENTRY.size):
+            check, data = ENTRY.unpack_from(self._buffer, slot)
+            if data and check ^ data == key:
+                self.hits += 1
+                move = (data >> 16) & 0xFFFF
+                return (data & 0xFF, (data >> 8) & 0x3, (data >> 32) - (1 << 31),
+                        decode_move(move) if move else None)
+        self.misses += 1
+        return None
+    
+    def store(self, key, depth, bound, score, move):
+        """Store a result, keeping the deepest recent one in each bucket's first entry"""
+        offset = (key % self.buckets) * BUCKET_SIZE
+        check, data = ENTRY.unpack_from(self._buffer, offset)
+        stale = (data >> 10) & 0x3F != self.generation
+        if data and not stale and depth < data & 0xFF:
+            offset += ENTRY.size
+        
+        data = (depth | bound << 8 | self.generation << 10
+                | (encode_move(move) if move else 0) << 16 | (score + (1 << 31)) << 32)
+        ENTRY.pack_into(self._buffer, offset, key ^ data, data)
+    
+    def new_search(self):
+        """Age existing entries so a new search can replace them freely"""
+        self.generation = (self.generation + 1) % GENERATIONS
+    
+    def usage(self):
+        """Fraction of a sample of entries written by the current search"""
+        sample = min(self.buckets, 1000)
+        used = 0
+        for bucket in range(sample):
+            for slot in (bucket * BUCKET_SIZE, bucket * BUCKET_SIZE + ENTRY.size):
+                data = ENTRY.unpack_from(self._buffer, slot)[1]
+                used += data and (data >> 10) & 0x3F == self.generation
+        return used / (2 * sample)
+    
+    def clear(self):
+        self._buffer[:] = bytes(len(self._buffer))
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+def encode_move(move):
+    """Pack a (from_pos, to_pos) move into 12 bits"""
+    (from_row, from_col), (to_row, to_col) = move
+    return (from_row * 8 + from_col) | (to_row * 8 + to_col) << 6
+
+def decode_move(move):
+    from_sq, to_sq = move & 0x3F, move >> 6
+    return (from_sq // 8, from_sq % 8), (to_sq // 8, to_sq % 8)
@@ -1,5 +1,6 @@
 import pygame
 import os
+from collections import OrderedDict
 
 def load_image(filename, size=(80, 80)):
     """Load an image and scale it to the desired size"""
@@ -10,4 +11,50 @@ def load_image(filename, size=(80, 80)):
         # Create a placeholder if image not found
         surface = pygame.Surface(size, pygame.SRCALPHA)
         pygame.draw.rect(surface, (200, 0, 0), (0, 0, size[0], size[1]), 2)
-        return surface
\ No newline at end of file
+        return surface
+
+# Layout of the sprite atlas, matching the sprites chess_pieces.py generates
+PIECE_COLORS = ["white", "black"]
+PIECE_TYPES = ["pawn", "rook", "knight", "bishop", "queen", "king"]
+SPRITE_SIZE = 80
+ATLAS_PADDING = 2  # Transparent gutter so scaling doesn't bleed neighbours together
+ATLAS_CACHE_SIZES = 4
+
+class SpriteAtlas:
+    """Every piece sprite packed into one surface.
+    
+    The sheet is scaled and converted to the display format once per sprite
+    size, so drawing a piece is a single blit from the cached sheet.
+    """
+    
+    def __init__(self):
+        cell = SPRITE_SIZE + 2 * ATLAS_PADDING
+        self._sheet = pygame.Surface((cell * len(PIECE_TYPES), cell * len(PIECE_COLORS)), pygame.SRCALPHA)
+        for row, color in enumerate(PIECE_COLORS):
+            for col, piece_type in enumerate(PIECE_TYPES):
+                image = load_image(f"{color}_{piece_type}.png", (SPRITE_SIZE, SPRITE_SIZE))
+                self._sheet.blit(image, (col * cell + ATLAS_PADDING, row * cell + ATLAS_PADDING))
+        self._sizes = OrderedDict()  # Sprite size -> (converted sheet, cell size, padding), most recent last
+    
+    def blit(self, target, color, piece_type, size, center):
+        """Draw a piece scaled to size x size pixels, centred on center"""
+        sheet, cell, padding = self._scaled(size)
+        area = pygame.Rect(PIECE_TYPES.index(piece_type) * cell + padding,
+                           PIECE_COLORS.index(color) * cell + padding, size, size)
+        target.blit(sheet, (center[0] - size // 2, center[1] - size // 2), area)
+    
+    def _scaled(self, size):
+        entry = self._sizes.get(size)
+        if entry is None:
+            padding = max(1, round(ATLAS_PADDING * size / SPRITE_SIZE))
+            cell = size + 2 * padding
+            sheet = pygame.transform.smoothscale(
+                self._sheet, (cell * len(PIECE_TYPES), cell * len(PIECE_COLORS)))
+            entry = (sheet.convert_alpha(), cell, padding)
+            # A few sizes are enough to flip between; dragging a window edge makes many
+            if len(self._sizes) >= ATLAS_CACHE_SIZES:
+                self._sizes.popitem(last=False)
+            self._sizes[size] = entry
+        else:
+            self._sizes.move_to_end(size)
+        return entry
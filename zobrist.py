@@ -0,0 +1,37 @@
+# zobrist.py
+import random
+
+from pieces.pawn import Pawn
+from pieces.rook import Rook
+from pieces.knight import Knight
+from pieces.bishop import Bishop
+from pieces.queen import Queen
+from pieces.king import King
+
+# A fixed seed keeps keys identical across runs and processes, so they can be
+# stored on disk and compared between workers
+_random = random.Random(0x5EED_C4E55)
+
+# One key per piece type, color and square (square = row * 8 + col)
+PIECE_KEYS = {
+    color: {piece_type: [_random.getrandbits(64) for _ in range(64)]
+            for piece_type in (Pawn, Knight, Bishop, Rook, Queen, King)}
+    for color in ("white", "black")
+}
+
+# Castling rights are a 4-bit mask; CASTLING_KEYS[rights] is the XOR of the keys of its bits
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+_castling_bit_keys = [_random.getrandbits(64) for _ in range(4)]
+CASTLING_KEYS = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights & (1 << _bit):
+            CASTLING_KEYS[_rights] ^= _castling_bit_keys[_bit]
+
+# En passant file, only hashed when a capture is actually possible
+EN_PASSANT_KEYS = [_random.getrandbits(64) for _ in range(8)]
+
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)